@@ -0,0 +1,69 @@
+"""
+JVM启动参数基准测试 - 对比默认参数与启动优化参数的单次调用耗时
+
+使用方法：
+    python benchmarks/bench_jvm_startup.py [--apk 文件路径] [--runs 次数]
+
+未指定APK时执行 VasDolly.jar help，只测量JVM启动和jar加载开销。
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from core.java_runner import JavaRunner
+
+
+def measure(runner, args, runs, apk_path=None):
+    """执行多次命令，返回每次耗时（毫秒）"""
+    # 预热一次，排除首次读取磁盘的影响
+    runner.run_command(args, apk_path=apk_path)
+    
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _, stderr, code = runner.run_command(args, apk_path=apk_path)
+        samples.append((time.perf_counter() - start) * 1000)
+        if code != 0:
+            print(f"警告: 命令返回 {code}: {stderr.strip()[:200]}")
+    return samples
+
+
+def report(name, samples):
+    """输出统计结果"""
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<8} 平均 {statistics.mean(samples):8.1f} ms  "
+        f"中位数 {statistics.median(samples):8.1f} ms  "
+        f"P95 {p95:8.1f} ms  最小 {samples[0]:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JVM启动参数基准测试')
+    parser.add_argument('--apk', help='用于get -c的APK文件，未指定时执行help')
+    parser.add_argument('--runs', type=int, default=20, help='每组执行次数')
+    options = parser.parse_args()
+    
+    args = ['get', '-c'] if options.apk else ['help']
+    
+    baseline = JavaRunner(tuned=False)
+    tuned = JavaRunner(tuned=True)
+    print(f"Java: {baseline.get_java_version()}")
+    print(f"优化参数: {' '.join(tuned.jvm_flags) or '（当前Java版本不支持）'}")
+    print(f"命令: {' '.join(args + ([options.apk] if options.apk else []))}，每组 {options.runs} 次\n")
+    
+    before = measure(baseline, args, options.runs, options.apk)
+    after = measure(tuned, args, options.runs, options.apk)
+    
+    report('默认参数', before)
+    report('优化参数', after)
+    print(f"\n中位数提升: {(1 - statistics.median(after) / statistics.median(before)) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
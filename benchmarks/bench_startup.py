@@ -0,0 +1,104 @@
+"""
+启动耗时基准测试 - 启动打包后的程序，测量窗口显示耗时和首次解析耗时
+
+使用方法：
+    python benchmarks/bench_startup.py dist/VasDollyTool [dist/VasDollyTool/VasDollyTool ...]
+        [--apk 文件路径] [--runs 次数]
+
+可同时传入onefile和onedir两种产物进行对比，也可传入 "python src/main.py" 测量开发模式。
+需要图形环境（tkinter窗口必须能够显示）。
+"""
+import os
+import sys
+import time
+import shlex
+import argparse
+import statistics
+import subprocess
+
+
+def launch_once(command, apk_path, timeout):
+    """
+    启动一次程序
+    
+    Returns:
+        (窗口显示耗时ms, 首次解析耗时ms或None)
+    """
+    env = dict(os.environ)
+    env['VASDOLLY_STARTUP_PROBE'] = '1'
+    if apk_path:
+        env['VASDOLLY_PROBE_APK'] = os.path.abspath(apk_path)
+    
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env,
+        text=True,
+        encoding='utf-8',
+        errors='ignore'
+    )
+    
+    window_ms = None
+    result_ms = None
+    try:
+        for line in proc.stdout:
+            elapsed = (time.perf_counter() - start) * 1000
+            if line.startswith('PROBE window'):
+                window_ms = elapsed
+            elif line.startswith('PROBE result'):
+                result_ms = elapsed
+            elif line.startswith('PROBE error'):
+                print(f"  解析失败: {line.strip()}")
+            if time.perf_counter() - start > timeout:
+                break
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    
+    return window_ms, result_ms
+
+
+def format_ms(value):
+    """格式化单次耗时"""
+    return f"{value:.1f} ms" if value is not None else "无"
+
+
+def summarize(samples):
+    """格式化统计结果"""
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return "无数据"
+    return f"中位数 {statistics.median(samples):8.1f} ms  最小 {min(samples):8.1f} ms  最大 {max(samples):8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准测试')
+    parser.add_argument('targets', nargs='+', help='可执行文件路径或完整命令')
+    parser.add_argument('--apk', help='用于测量首次解析耗时的APK文件')
+    parser.add_argument('--runs', type=int, default=5, help='每个目标的启动次数')
+    parser.add_argument('--timeout', type=float, default=120, help='单次启动超时（秒）')
+    options = parser.parse_args()
+    
+    for target in options.targets:
+        command = [target] if os.path.exists(target) else shlex.split(target)
+        print(f"\n{target}")
+        
+        windows, results = [], []
+        for i in range(options.runs):
+            window_ms, result_ms = launch_once(command, options.apk, options.timeout)
+            windows.append(window_ms)
+            results.append(result_ms)
+            print(f"  第{i + 1}次: 窗口 {format_ms(window_ms)}, 首次结果 {format_ms(result_ms)}")
+        
+        print(f"  窗口显示: {summarize(windows)}")
+        if options.apk:
+            print(f"  首次结果: {summarize(results)}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+进程内渠道读取的模糊测试与回归用例 - 验证任意输入都只会在有界时间和内存内返回结果或ApkFormatError
+
+使用方法：
+    python benchmarks/fuzz_apk_reader.py [--iterations 次数] [--seed 种子]
+        [--time-limit 毫秒] [--save-dir 失败用例目录]
+
+先运行固定的回归用例（声明超大签名块/中央目录、ZIP64偏移越界、海量ID-值对、
+注释中大量伪造EOCD、V1长度异常等），再对gen_corpus生成的种子文件做随机变异。
+每个输入分别以内存数据、文件对象和文件路径三种方式读取，检查：
+    - 只返回结果或抛出ApkFormatError，不抛出其他异常
+    - 单次读取耗时不超过 --time-limit
+    - Python内存分配峰值不超过签名块上限加1MB
+任一检查失败时退出码为1，--save-dir 指定时保存失败的输入。
+"""
+import io
+import os
+import logging
+import sys
+import time
+import random
+import struct
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from core.apk_reader import (
+    ApkFormatError, read_channel_info, EOCD_MAGIC, MAX_SIGNING_BLOCK_SIZE, MAX_SIGNING_BLOCK_PAIRS,
+)
+from gen_corpus import (
+    write_apk, build_signing_block, build_v1_comment, SCHEMES, V2_SIGNATURE_ID, VASDOLLY_ID, WALLE_ID,
+)
+
+
+# 变异输入会触发大量解码告警，只保留错误日志
+logging.getLogger('VasDollyTool').setLevel(logging.ERROR)
+
+MEMORY_LIMIT = MAX_SIGNING_BLOCK_SIZE + 1024 * 1024
+
+# 覆盖写入结构字段时使用的边界值
+INTERESTING_VALUES = (0, 1, 0x7F, 0xFF, 0x7FFF, 0xFFFF, 0x7FFFFFFF, 0xFFFFFFFF, 0x100000000,
+                      MAX_SIGNING_BLOCK_SIZE + 1, 0x7FFFFFFFFFFFFFFF, 0xFFFFFFFFFFFFFFFF)
+
+
+def build_seed(tmp_dir, size, scheme, zip64, seed):
+    """生成一个种子文件，返回 (字节, 布局信息)"""
+    path = os.path.join(tmp_dir, 'seed.apk')
+    layout = write_apk(path, size, f'seed_{seed}', scheme, entry_count=3, zip64=zip64, seed=seed)
+    with open(path, 'rb') as f:
+        return f.read(), layout
+
+
+def patch(data, offset, fmt, value):
+    """在指定偏移写入整数，偏移越界时原样返回"""
+    data = bytearray(data)
+    width = struct.calcsize(fmt)
+    if 0 <= offset <= len(data) - width:
+        struct.pack_into(fmt, data, offset, value & ((1 << (width * 8)) - 1))
+    return bytes(data)
+
+
+def replace_tail(base, layout, block=None, comment=None):
+    """用新的签名块或注释替换种子文件尾部，并修正EOCD中的中央目录偏移和注释长度"""
+    block_offset = layout['block_offset']
+    old_block = base[block_offset:layout['cd_offset']]
+    block = old_block if block is None else block
+    cd_and_eocd = base[layout['cd_offset']:layout['eocd_offset'] + 22]
+    comment = base[layout['eocd_offset'] + 22:] if comment is None else comment
+    data = bytearray(base[:block_offset] + block + cd_and_eocd + comment)
+    eocd = block_offset + len(block) + len(cd_and_eocd) - 22
+    struct.pack_into('<I', data, eocd + 16, block_offset + len(block))
+    struct.pack_into('<H', data, eocd + 20, len(comment))
+    return bytes(data)
+
+
+def regression_cases(tmp_dir):
+    """固定的恶意/损坏输入"""
+    base, layout = build_seed(tmp_dir, 8192, 'vasdolly', False, 1)
+    base64, layout64 = build_seed(tmp_dir, 8192, 'vasdolly', True, 2)
+    eocd = layout['eocd_offset']
+    cd = layout['cd_offset']
+    block = layout['block_offset']
+    first_pair = block + layout['pair_offsets'][0]
+    
+    cases = {
+        'empty': b'',
+        'eocd_only': EOCD_MAGIC + b'\x00' * 18,
+        'short_eocd': base[eocd:eocd + 21],
+        'block_size_2^63': patch(base, cd - 24, '<Q', 1 << 63),
+        'block_size_over_limit': patch(base, cd - 24, '<Q', MAX_SIGNING_BLOCK_SIZE + 1),
+        'block_size_past_start': patch(base, cd - 24, '<Q', cd),
+        'block_size_under_min': patch(base, cd - 24, '<Q', 8),
+        'cd_offset_past_eof': patch(base, eocd + 16, '<I', 0xFFFFFFFE),
+        'cd_size_4g': patch(base, eocd + 12, '<I', 0xFFFFFFFE),
+        'zip64_saturated_without_locator': patch(base, eocd + 16, '<I', 0xFFFFFFFF),
+        'zip64_locator_2^64': patch(base64, layout64['eocd_offset'] - 12, '<Q', 0xFFFFFFFFFFFFFFFF),
+        'zip64_cd_offset_2^63': patch(base64, layout64['zip64_eocd_offset'] + 48, '<Q', 1 << 63),
+        'zip64_cd_size_2^64': patch(base64, layout64['zip64_eocd_offset'] + 40, '<Q', 0xFFFFFFFFFFFFFFFF),
+        'pair_size_2^63': patch(base, first_pair, '<Q', 1 << 63),
+        'pair_size_zero': patch(base, first_pair, '<Q', 0),
+        'pair_size_minus_one': patch(base, first_pair, '<Q', 0xFFFFFFFFFFFFFFFF),
+        'truncated_in_block': base[:block + 100],
+        'truncated_in_cd': base[:cd + 10],
+    }
+    
+    # 大量最小的ID-值对
+    tiny_pairs = [(0x1000 + i, b'') for i in range(MAX_SIGNING_BLOCK_PAIRS * 4)]
+    cases['too_many_pairs'] = replace_tail(base, layout, block=build_signing_block(tiny_pairs)[0])
+    
+    # 渠道值超过解码上限、Walle深度嵌套的JSON
+    cases['huge_channel_value'] = replace_tail(
+        base, layout, block=build_signing_block([(V2_SIGNATURE_ID, b'x' * 64), (VASDOLLY_ID, b'a' * 200000)])[0])
+    cases['walle_nested_json'] = replace_tail(
+        base, layout, block=build_signing_block([(WALLE_ID, b'[' * 60000 + b']' * 60000)])[0])
+    cases['vasdolly_invalid_utf8'] = replace_tail(
+        base, layout, block=build_signing_block([(VASDOLLY_ID, b'\xff\xfe\xfd')])[0])
+    
+    # 注释中充满伪造的EOCD魔数
+    cases['comment_full_of_eocd'] = replace_tail(base, layout, comment=(EOCD_MAGIC * 16383)[:0xFFFF])
+    
+    # V1注释异常（去掉签名块，使读取回退到V1）
+    v1 = build_v1_comment('channel')
+    cases['v1_negative_length'] = replace_tail(
+        base, layout, block=b'', comment=v1[:-10] + struct.pack('<h', -5) + v1[-8:])
+    cases['v1_length_over_comment'] = replace_tail(
+        base, layout, block=b'', comment=v1[:-10] + struct.pack('<h', 0x7FFF) + v1[-8:])
+    cases['v1_invalid_utf8'] = replace_tail(
+        base, layout, block=b'', comment=b'\xff\xfe' + struct.pack('<h', 2) + v1[-8:])
+    return cases
+
+
+def mutate(data, layout, rng):
+    """对种子做1~4次随机变异，偏向文件尾部的结构字段"""
+    data = bytes(data)
+    hotspots = [layout['block_offset'], layout['cd_offset'] - 24, layout['eocd_offset'],
+                layout['eocd_offset'] + 12, layout['eocd_offset'] + 16]
+    hotspots += [layout['block_offset'] + offset for offset in layout['pair_offsets']]
+    if layout['zip64_eocd_offset'] is not None:
+        hotspots += [layout['zip64_eocd_offset'] + 40, layout['zip64_eocd_offset'] + 48,
+                     layout['eocd_offset'] - 12]
+    
+    for _ in range(rng.randint(1, 4)):
+        op = rng.random()
+        if op < 0.4:
+            offset = rng.choice(hotspots) + rng.choice((0, 0, 0, rng.randint(-8, 8)))
+            fmt = rng.choice(('<H', '<I', '<Q'))
+            data = patch(data, offset, fmt, rng.choice(INTERESTING_VALUES + (len(data), len(data) - 1)))
+        elif op < 0.7:
+            buf = bytearray(data)
+            tail = min(len(buf), 8192)
+            for _ in range(rng.randint(1, 16)):
+                if buf:
+                    buf[len(buf) - 1 - rng.randrange(tail)] ^= 1 << rng.randrange(8)
+            data = bytes(buf)
+        elif op < 0.85:
+            data = data[:rng.randrange(len(data) + 1)]
+        else:
+            data = data + rng.randbytes(rng.randint(1, 70000))
+    return data
+
+
+def check(data, tmp_path, time_limit_ms):
+    """
+    以三种方式读取一个输入
+    
+    Returns:
+        (结果或错误码, 最大耗时ms, 内存峰值字节, 失败原因或None)
+    """
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    
+    outcome = None
+    worst_ms = 0.0
+    worst_peak = 0
+    for make_source in (lambda: data, lambda: io.BytesIO(data), lambda: tmp_path):
+        # 先不开tracemalloc计时，再单独跑一次统计内存峰值，避免追踪开销计入耗时
+        start = time.perf_counter()
+        try:
+            info = read_channel_info(make_source())
+            outcome = f"ok:{info['vendor']}"
+        except ApkFormatError as e:
+            outcome = e.code
+        except Exception as e:
+            return outcome, worst_ms, worst_peak, f"{type(e).__name__}: {e}"
+        worst_ms = max(worst_ms, (time.perf_counter() - start) * 1000)
+        
+        tracemalloc.start()
+        try:
+            read_channel_info(make_source())
+        except ApkFormatError:
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        worst_peak = max(worst_peak, peak)
+    
+    if worst_ms > time_limit_ms:
+        return outcome, worst_ms, worst_peak, f"耗时 {worst_ms:.1f}ms 超过 {time_limit_ms}ms"
+    if worst_peak > MEMORY_LIMIT:
+        return outcome, worst_ms, worst_peak, f"内存峰值 {worst_peak} 超过 {MEMORY_LIMIT}"
+    return outcome, worst_ms, worst_peak, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='进程内渠道读取模糊测试')
+    parser.add_argument('--iterations', type=int, default=5000, help='随机变异次数')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--time-limit', type=float, default=100, help='单次读取耗时上限（毫秒）')
+    parser.add_argument('--save-dir', help='保存失败输入的目录')
+    options = parser.parse_args()
+    
+    rng = random.Random(options.seed)
+    outcomes = Counter()
+    timings = []
+    failures = []
+    peak_max = 0
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_path = os.path.join(tmp_dir, 'input.apk')
+        
+        def run(name, data):
+            nonlocal peak_max
+            outcome, elapsed_ms, peak, failure = check(data, tmp_path, options.time_limit)
+            outcomes[outcome] += 1
+            timings.append(elapsed_ms)
+            peak_max = max(peak_max, peak)
+            if failure:
+                failures.append((name, data, failure))
+                print(f"失败 {name}: {failure}")
+            return outcome
+        
+        print("回归用例:")
+        for name, data in regression_cases(tmp_dir).items():
+            print(f"  {name:<36} {run(name, data)}")
+        
+        seeds = []
+        for i, scheme in enumerate(SCHEMES):
+            for zip64 in (False, True):
+                seeds.append(build_seed(tmp_dir, rng.choice((2048, 8192, 65536)), scheme, zip64, i))
+        
+        for i in range(options.iterations):
+            data, layout = rng.choice(seeds)
+            run(f'mutation-{i}', mutate(data, layout, rng))
+    
+    print(f"\n共 {len(timings)} 个输入，结果分布:")
+    for outcome, count in outcomes.most_common():
+        print(f"  {outcome:<28} {count}")
+    print(f"耗时中位数 {statistics.median(timings):.3f}ms，最大 {max(timings):.3f}ms，"
+          f"内存峰值最大 {peak_max / 1024:.1f}KB")
+    
+    if failures and options.save_dir:
+        os.makedirs(options.save_dir, exist_ok=True)
+        for name, data, _ in failures:
+            with open(os.path.join(options.save_dir, f'{name}.apk'), 'wb') as f:
+                f.write(data)
+        print(f"失败输入已保存到 {options.save_dir}")
+    print(f"失败 {len(failures)} 个")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+"""
+合成APK测试集生成工具 - 为基准测试和压力测试生成可复现的APK结构文件
+
+使用方法：
+    python benchmarks/gen_corpus.py 输出目录 [--count 数量] [--size 1M,8M] [--entries 条目数]
+        [--mix vasdolly=70,walle=10,v1=10,none=5,custom=5] [--corrupt 比例]
+        [--zip64] [--dense] [--clone auto|never] [--seed 种子]
+
+生成的文件不是可安装的APK，但ZIP结构（本地文件头、中央目录、EOCD、ZIP64记录）、
+V2签名块（含对齐填充）和V1注释渠道都符合格式，足以覆盖渠道读取、批量扫描和缓存路径。
+同一种子、同一参数总是生成相同的文件集，输出目录下的 manifest.jsonl 记录每个文件的预期渠道。
+
+默认条目内容为稀疏空洞，几乎不占磁盘空间；--dense 时写入确定性的伪随机内容，
+并在文件系统支持时（btrfs、XFS、APFS等）通过reflink共享相同大小文件的条目数据，
+每个文件只有末尾的签名块和中央目录占用独立空间。
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+
+
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+V2_SIGNATURE_ID = 0x7109871a
+VASDOLLY_ID = 0x881155ff
+WALLE_ID = 0x71777777
+PADDING_ID = 0x42726577
+CUSTOM_ID = 0x12345678
+SIG_BLOCK_ALIGNMENT = 4096
+
+V1_MAGIC = b'ltlovezh'
+
+# Linux FICLONE ioctl：整个文件共享数据块
+FICLONE = 0x40049409
+
+CHANNEL_NAMES = ('huawei', 'xiaomi', 'oppo', 'vivo', 'honor', 'baidu', 'tencent', 'meizu', '360', 'google')
+
+# 渠道写入方式：vasdolly（V2签名块）、walle（V2签名块JSON）、v1（ZIP注释）、
+# v1v2（同时写入注释和签名块）、custom（未注册的自定义ID）、none（无渠道）
+SCHEMES = ('vasdolly', 'walle', 'v1', 'v1v2', 'custom', 'none')
+
+# 损坏类型
+CORRUPTIONS = (
+    'truncated',        # 文件在中央目录中间被截断
+    'no_eocd',          # EOCD魔数被破坏
+    'cd_offset',        # 中央目录偏移指向文件之外
+    'block_magic',      # 签名块魔数错误
+    'block_size',       # 签名块头尾大小不一致
+    'pair_overflow',    # 第一个ID-值对的长度超出签名块
+)
+
+
+def parse_size(text):
+    """'10M' -> 10485760"""
+    text = text.strip().upper()
+    if text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def parse_mix(text):
+    """'vasdolly=70,v1=30' -> [('vasdolly', 70.0), ('v1', 30.0)]"""
+    mix = []
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCHEMES:
+            raise argparse.ArgumentTypeError(f"未知的渠道写入方式: {name}，可选 {', '.join(SCHEMES)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def entry_names(count):
+    """条目名称，前几个与真实APK一致"""
+    names = ['AndroidManifest.xml', 'classes.dex', 'resources.arsc']
+    names += [f'res/raw/blob_{i:05d}.bin' for i in range(count - len(names))]
+    return [name.encode('utf-8') for name in names[:count]]
+
+
+def build_signing_block(pairs):
+    """
+    生成APK签名块，并用填充ID把总长度对齐到4096字节（与apksigner一致）
+    
+    Returns:
+        (签名块字节, [每个ID-值对相对签名块起始的偏移])
+    """
+    body = b''
+    offsets = []
+    for block_id, value in pairs:
+        offsets.append(8 + len(body))
+        body += struct.pack('<QI', len(value) + 4, block_id) + value
+    
+    pad = -(8 + len(body) + 24) % SIG_BLOCK_ALIGNMENT
+    if 0 < pad < 12:
+        pad += SIG_BLOCK_ALIGNMENT
+    if pad:
+        body += struct.pack('<QI', pad - 8, PADDING_ID) + b'\x00' * (pad - 12)
+    
+    block_size = len(body) + 24
+    block = struct.pack('<Q', block_size) + body + struct.pack('<Q', block_size) + b'APK Sig Block 42'
+    return block, offsets
+
+
+def build_pairs(scheme, channel, rng):
+    """按渠道写入方式生成签名块中的ID-值对，第一个总是V2签名"""
+    pairs = [(V2_SIGNATURE_ID, rng.randbytes(256))]
+    if scheme in ('vasdolly', 'v1v2'):
+        pairs.append((VASDOLLY_ID, channel.encode('utf-8')))
+    elif scheme == 'walle':
+        pairs.append((WALLE_ID, json.dumps({'channel': channel, 'build': 'corpus'}).encode('utf-8')))
+    elif scheme == 'custom':
+        pairs.append((CUSTOM_ID, channel.encode('utf-8')))
+    return pairs
+
+
+def build_v1_comment(channel):
+    """VasDolly V1渠道注释：渠道 + 长度(int16) + 魔数"""
+    data = channel.encode('utf-8')
+    return data + struct.pack('<h', len(data)) + V1_MAGIC
+
+
+def local_header(name, data_size, crc, zip64):
+    """本地文件头（存储方式，不压缩）"""
+    if zip64:
+        extra = struct.pack('<HHQQ', 1, 16, data_size, data_size)
+        sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+    else:
+        extra = b''
+        sizes = (data_size, data_size)
+    return struct.pack('<4sHHHHHIIIHH', b'PK\x03\x04', 45 if zip64 else 20, 0, 0, 0, 0x21,
+                       crc, sizes[0], sizes[1], len(name), len(extra)) + name + extra
+
+
+def build_tail(entries, block, comment, zip64):
+    """
+    生成签名块之后的全部内容：中央目录、ZIP64记录和EOCD
+    
+    Args:
+        entries: [(名称, 本地文件头偏移, 数据大小, CRC)]
+        block: 签名块字节，紧接在最后一个条目之后
+        comment: ZIP注释
+        zip64: 是否写入ZIP64结构
+    
+    Returns:
+        (签名块起始偏移之后的字节, 布局信息)
+    """
+    last_name, last_offset, last_size, _ = entries[-1]
+    block_offset = last_offset + len(local_header(last_name, last_size, 0, zip64)) + last_size
+    cd_offset = block_offset + len(block)
+    
+    cd = b''
+    for name, header_offset, data_size, crc in entries:
+        if zip64:
+            extra = struct.pack('<HHQQQ', 1, 24, data_size, data_size, header_offset)
+            sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+            offset_field = 0xFFFFFFFF
+        else:
+            extra = b''
+            sizes = (data_size, data_size)
+            offset_field = header_offset
+        cd += struct.pack('<4sHHHHHHIIIHHHHHII', b'PK\x01\x02', 45, 45 if zip64 else 20, 0, 0, 0, 0x21,
+                          crc, sizes[0], sizes[1], len(name), len(extra), 0, 0, 0, 0, offset_field)
+        cd += name + extra
+    
+    tail = block + cd
+    layout = {'block_offset': block_offset, 'cd_offset': cd_offset, 'zip64_eocd_offset': None}
+    count = len(entries)
+    if zip64:
+        zip64_offset = cd_offset + len(cd)
+        tail += struct.pack('<4sQHHIIQQQQ', b'PK\x06\x06', 44, 45, 45, 0, 0, count, count, len(cd), cd_offset)
+        tail += struct.pack('<4sIQI', b'PK\x06\x07', 0, zip64_offset, 1)
+        tail += struct.pack('<4sHHHHIIH', b'PK\x05\x06', 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, len(comment))
+        layout['zip64_eocd_offset'] = zip64_offset
+    else:
+        tail += struct.pack('<4sHHHHIIH', b'PK\x05\x06', 0, 0, count, count, len(cd), cd_offset, len(comment))
+    layout['eocd_offset'] = block_offset + len(tail) - 22
+    tail += comment
+    layout['size'] = block_offset + len(tail)
+    return tail, layout
+
+
+def plan_entries(size, entry_count, tail_size, zip64):
+    """
+    分配各条目的数据大小，使文件总大小等于目标值
+    
+    Returns:
+        [(名称, 本地文件头偏移, 数据大小)]
+    """
+    names = entry_names(entry_count)
+    headers = sum(len(local_header(name, 0, 0, zip64)) for name in names)
+    data_total = max(0, size - headers - tail_size)
+    per_entry, remainder = divmod(data_total, len(names))
+    
+    planned = []
+    offset = 0
+    for i, name in enumerate(names):
+        data_size = per_entry + (remainder if i == len(names) - 1 else 0)
+        planned.append((name, offset, data_size))
+        offset += len(local_header(name, data_size, 0, zip64)) + data_size
+    return planned
+
+
+def write_entries(f, planned, zip64, fill):
+    """
+    写入本地文件头和条目数据
+    
+    Args:
+        fill: 条目内容的填充块，为None时跳过数据形成稀疏空洞（CRC记为0）
+    
+    Returns:
+        [(名称, 本地文件头偏移, 数据大小, CRC)]
+    """
+    entries = []
+    for name, offset, data_size in planned:
+        crc = 0
+        chunks, rest = divmod(data_size, len(fill)) if fill is not None else (0, 0)
+        if fill is not None:
+            for _ in range(chunks):
+                crc = zlib.crc32(fill, crc)
+            crc = zlib.crc32(fill[:rest], crc)
+        f.seek(offset)
+        f.write(local_header(name, data_size, crc, zip64))
+        if fill is None:
+            f.seek(data_size, os.SEEK_CUR)
+        else:
+            for _ in range(chunks):
+                f.write(fill)
+            f.write(fill[:rest])
+        entries.append((name, offset, data_size, crc))
+    return entries
+
+
+def write_apk(path, size, channel=None, scheme='vasdolly', entry_count=3, zip64=None,
+              fill=None, seed=0, template=None):
+    """
+    生成一个APK结构文件
+    
+    Args:
+        path: 输出路径
+        size: 目标文件大小（字节），小于结构本身所需大小时条目为空
+        channel: 渠道名
+        scheme: 渠道写入方式，见 SCHEMES
+        entry_count: 条目数量
+        zip64: 是否使用ZIP64，为None时在大小或条目数超出限制时自动启用
+        fill: 条目内容填充块，为None时生成稀疏文件
+        seed: 签名数据的随机种子
+        template: (模板路径, 条目列表)，提供时先clone模板再只重写末尾
+    
+    Returns:
+        布局信息字典（block_offset、cd_offset、eocd_offset、zip64_eocd_offset、size、pair_offsets）
+    """
+    if zip64 is None:
+        zip64 = size >= 0xFFFFFFFF or entry_count >= 0xFFFF
+    rng = random.Random(seed)
+    channel = channel or ''
+    
+    pairs = build_pairs(scheme, channel, rng)
+    block, pair_offsets = build_signing_block(pairs)
+    comment = build_v1_comment(channel) if scheme in ('v1', 'v1v2') else b''
+    
+    if template is not None:
+        template_path, entries = template
+        clone_file(template_path, path)
+        tail, layout = build_tail(entries, block, comment, zip64)
+        with open(path, 'r+b') as f:
+            f.truncate(layout['block_offset'])
+            f.seek(layout['block_offset'])
+            f.write(tail)
+    else:
+        dummy = [(name, 0, 0, 0) for name in entry_names(entry_count)]
+        tail_size = len(build_tail(dummy, block, comment, zip64)[0])
+        planned = plan_entries(size, entry_count, tail_size, zip64)
+        with open(path, 'wb') as f:
+            entries = write_entries(f, planned, zip64, fill)
+            tail, layout = build_tail(entries, block, comment, zip64)
+            f.seek(layout['block_offset'])
+            f.write(tail)
+        layout['entries'] = entries
+    
+    layout['zip64'] = zip64
+    layout['pair_offsets'] = pair_offsets
+    return layout
+
+
+def clone_file(src, dst):
+    """reflink复制文件，文件系统不支持时抛出OSError"""
+    import fcntl
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def reflink_supported(directory):
+    """检测目录所在文件系统是否支持reflink"""
+    if not sys.platform.startswith('linux'):
+        return False
+    src = os.path.join(directory, '.reflink_probe_src')
+    dst = os.path.join(directory, '.reflink_probe_dst')
+    try:
+        with open(src, 'wb') as f:
+            f.write(b'\x00' * 4096)
+        clone_file(src, dst)
+        return True
+    except OSError:
+        return False
+    finally:
+        for path in (src, dst):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def corrupt_apk(path, layout, kind):
+    """按损坏类型修改已生成的文件"""
+    block_offset = layout['block_offset']
+    with open(path, 'r+b') as f:
+        if kind == 'truncated':
+            f.truncate(layout['cd_offset'] + (layout['eocd_offset'] - layout['cd_offset']) // 2)
+        elif kind == 'no_eocd':
+            f.seek(layout['eocd_offset'])
+            f.write(b'\x00\x00\x00\x00')
+        elif kind == 'cd_offset':
+            if layout['zip64_eocd_offset'] is not None:
+                f.seek(layout['zip64_eocd_offset'] + 48)
+                f.write(struct.pack('<Q', layout['size'] + 4096))
+            else:
+                f.seek(layout['eocd_offset'] + 16)
+                f.write(struct.pack('<I', min(layout['size'] + 4096, 0xFFFFFFFE)))
+        elif kind == 'block_magic':
+            f.seek(layout['cd_offset'] - 16)
+            f.write(b'APK Sig Block 24')
+        elif kind == 'block_size':
+            f.seek(block_offset)
+            f.write(struct.pack('<Q', layout['cd_offset'] - block_offset + 4096))
+        elif kind == 'pair_overflow':
+            f.seek(block_offset + layout['pair_offsets'][0])
+            f.write(struct.pack('<Q', 0x7FFFFFFFFFFFFFFF))
+        else:
+            raise ValueError(f"未知的损坏类型: {kind}")
+
+
+def expected_channel(scheme, channel):
+    """使用默认解码器注册表时应读出的渠道"""
+    return None if scheme in ('none', 'custom') else channel
+
+
+def generate_corpus(output_dir, count, sizes, entry_count=3, mix=None, corrupt_ratio=0.0,
+                    zip64=None, dense=False, clone='auto', seed=1):
+    """
+    生成测试集并写入 manifest.jsonl
+    
+    Returns:
+        统计信息字典
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    mix = mix or [('vasdolly', 1.0)]
+    schemes = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    
+    use_clone = dense and clone != 'never' and reflink_supported(output_dir)
+    fill = random.Random(seed).randbytes(64 * 1024) if dense else None
+    templates = {}
+    width = len(str(count - 1))
+    stats = {'files': 0, 'corrupted': 0, 'cloned': 0, 'bytes': 0}
+    
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, 'manifest.jsonl'), 'w', encoding='utf-8') as manifest:
+        for i in range(count):
+            size = rng.choice(sizes)
+            scheme = rng.choices(schemes, weights)[0]
+            channel = None if scheme == 'none' else f'{rng.choice(CHANNEL_NAMES)}_{i}'
+            corruption = rng.choice(CORRUPTIONS) if rng.random() < corrupt_ratio else None
+            file_name = f'app_{i:0{width}d}.apk'
+            path = os.path.join(output_dir, file_name)
+            
+            # 条目数据只与大小有关，相同大小的文件共享同一个模板的数据块
+            template = templates.get(size) if use_clone else None
+            try:
+                layout = write_apk(path, size, channel, scheme, entry_count, zip64, fill, seed + i, template)
+            except OSError:
+                if template is None:
+                    raise
+                use_clone = False
+                layout = write_apk(path, size, channel, scheme, entry_count, zip64, fill, seed + i)
+            if template is not None:
+                stats['cloned'] += 1
+            elif use_clone:
+                templates[size] = (path, layout['entries'])
+            
+            if corruption:
+                corrupt_apk(path, layout, corruption)
+                stats['corrupted'] += 1
+            
+            manifest.write(json.dumps({
+                'file': file_name,
+                'size': layout['size'],
+                'entries': entry_count,
+                'zip64': layout['zip64'],
+                'scheme': scheme,
+                'channel': expected_channel(scheme, channel),
+                'corrupt': corruption,
+            }, ensure_ascii=False) + '\n')
+            stats['files'] += 1
+            stats['bytes'] += layout['size']
+    
+    stats['elapsed'] = time.perf_counter() - start
+    stats['reflink'] = use_clone
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合成APK测试集生成工具')
+    parser.add_argument('output', help='输出目录')
+    parser.add_argument('--count', type=int, default=1000, help='文件数量')
+    parser.add_argument('--size', default='1M', help='逗号分隔的文件大小，每个文件随机选择其一')
+    parser.add_argument('--entries', type=int, default=3, help='每个文件的条目数量')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('vasdolly=70,walle=10,v1=10,none=5,custom=5'),
+                        help='渠道写入方式及权重')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='损坏文件的比例（0~1）')
+    parser.add_argument('--zip64', action='store_true', default=None, help='强制使用ZIP64结构')
+    parser.add_argument('--dense', action='store_true', help='写入实际条目内容而不是稀疏空洞')
+    parser.add_argument('--clone', choices=('auto', 'never'), default='auto',
+                        help='--dense时是否使用reflink共享条目数据')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    options = parser.parse_args()
+    
+    sizes = [parse_size(text) for text in options.size.split(',')]
+    stats = generate_corpus(options.output, options.count, sizes, options.entries, options.mix,
+                            options.corrupt, options.zip64, options.dense, options.clone, options.seed)
+    
+    rate = stats['files'] / stats['elapsed'] if stats['elapsed'] else 0
+    print(f"生成 {stats['files']} 个文件（损坏 {stats['corrupted']} 个），"
+          f"逻辑大小 {stats['bytes'] / UNITS['G']:.2f}GB，耗时 {stats['elapsed']:.2f}s（{rate:.0f} 个/秒）")
+    if options.dense:
+        print(f"reflink: {'启用' if stats['reflink'] else '不支持'}，共享数据的文件 {stats['cloned']} 个")
+    print(f"预期结果: {os.path.join(options.output, 'manifest.jsonl')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,27 @@
 打包脚本 - 使用PyInstaller打包应用
 
 使用方法：
-    python build.py
+    python build.py [--mode onefile|onedir] [--jlink] [--cds]
+
+选项：
+    --mode   onefile（默认）打包为单文件，每次启动都要解压Python运行时和JRE到临时目录；
+             onedir 打包为目录，启动时无需解压，适合频繁启动或内置JRE的场景
+    --jlink  使用JDK的jlink将内置JRE裁剪为VasDolly.jar所需的最小运行时
+    --cds    为VasDolly.jar生成AppCDS归档，缩短每次调用的JVM启动时间
 
 输出：
     Windows: dist/VasDollyTool.exe
     macOS: dist/VasDollyTool.app
+    onedir模式: dist/VasDollyTool/
 """
 import os
+import re
 import sys
+import json
+import argparse
 import platform
 import shutil
+import subprocess
 from pathlib import Path
 
 # 修复Windows控制台编码问题
@@ -20,6 +31,9 @@ if sys.platform == 'win32':
     sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
+# AppCDS归档的生成信息（生成归档的JVM版本），与归档位于同一目录
+CDS_INFO = 'VasDolly.jsa.json'
+
 
 def clean_build():
     """清理构建目录"""
@@ -59,17 +73,190 @@ def check_dependencies():
         input("按Enter继续...")
 
 
-def build():
-    """执行打包"""
+def get_platform_jre_dir():
+    """获取当前平台的内置JRE目录"""
+    system = platform.system()
+    if system == 'Windows':
+        return 'resources/jre/windows'
+    elif system == 'Darwin':
+        return 'resources/jre/macos'
+    return 'resources/jre/linux'
+
+
+def find_build_java():
+    """查找构建时使用的Java：优先使用将被打包的内置JRE，保证CDS归档与运行时一致"""
+    java_name = 'java.exe' if platform.system() == 'Windows' else 'java'
+    bundled = os.path.join(get_platform_jre_dir(), 'bin', java_name)
+    if os.path.exists(bundled):
+        return os.path.abspath(bundled)
+    return shutil.which('java')
+
+
+def get_java_version_output(java):
+    """获取java -version的完整输出"""
+    result = subprocess.run([java, '-version'], capture_output=True, text=True)
+    return result.stderr or result.stdout
+
+
+def get_java_major_version(java):
+    """获取Java主版本号"""
+    output = get_java_version_output(java)
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', output)
+    if not match:
+        return None
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+    return major
+
+
+def build_jlink_runtime():
+    """使用jlink生成只包含VasDolly.jar所需模块的精简JRE，替换内置JRE"""
+    print("\n生成jlink精简运行时...")
+    java_home = os.environ.get('JAVA_HOME')
+    jlink = shutil.which('jlink', path=os.path.join(java_home, 'bin')) if java_home else None
+    jlink = jlink or shutil.which('jlink')
+    if not jlink:
+        print("  跳过: 未找到jlink（需要JDK 9+，请设置JAVA_HOME）")
+        return
+    
+    # 通过jdeps分析jar依赖的模块
+    modules = 'java.base'
+    jdeps = os.path.join(os.path.dirname(jlink), 'jdeps')
+    try:
+        result = subprocess.run(
+            [jdeps, '--print-module-deps', '--ignore-missing-deps', 'resources/VasDolly.jar'],
+            capture_output=True,
+            text=True
+        )
+        if result.returncode == 0 and result.stdout.strip():
+            modules = result.stdout.strip().splitlines()[-1]
+    except OSError:
+        pass
+    print(f"  模块: {modules}")
+    
+    # 先输出到临时目录，成功后再替换，jlink失败时保留原有的内置JRE
+    output_dir = get_platform_jre_dir()
+    tmp_dir = f'{output_dir}.jlink-tmp'
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    
+    try:
+        subprocess.run([
+            jlink,
+            f'--add-modules={modules}',
+            f'--output={tmp_dir}',
+            '--strip-debug',
+            '--no-header-files',
+            '--no-man-pages',
+            '--compress=2',
+        ], check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"  失败: {e}，保留原有JRE")
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        return
+    
+    # jlink生成的运行时不带默认CDS归档，补充生成以加快JDK类加载
+    java_name = 'java.exe' if platform.system() == 'Windows' else 'java'
+    subprocess.run([os.path.join(tmp_dir, 'bin', java_name), '-Xshare:dump'], capture_output=True)
+    
+    # 目录不能直接覆盖非空目录，旧JRE先移开，替换成功后再删除
+    old_dir = f'{output_dir}.old'
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    
+    print(f"  输出: {output_dir} ({get_dir_size(output_dir) / (1024 * 1024):.2f} MB)")
+
+
+def generate_cds_archive():
+    """
+    为VasDolly.jar生成AppCDS动态归档
+    
+    在resources目录内以相对路径运行jar，运行时JavaRunner同样在jar目录下启动，
+    保证归档记录的类路径在打包后依然匹配。
+    训练运行使用JavaRunner的启动参数，对合成的样例APK执行 get -c，
+    使读取签名块和ZIP结构的类都进入归档。
+    """
+    print("\n生成AppCDS归档...")
+    if not os.path.exists('resources/VasDolly.jar'):
+        print("  跳过: 未找到 resources/VasDolly.jar")
+        return
+    
+    java = find_build_java()
+    if not java:
+        print("  跳过: 未找到Java")
+        return
+    
+    version = get_java_major_version(java)
+    if version is None or version < 13:
+        print(f"  跳过: 动态CDS归档需要Java 13+（当前: {version}）")
+        return
+    if 'J9' in get_java_version_output(java):
+        print("  跳过: 非HotSpot虚拟机不支持AppCDS")
+        return
+    
+    sys.path.insert(0, os.path.abspath('src'))
+    from core.java_runner import JavaRunner
+    
+    # 生成一个带VasDolly渠道的样例APK供训练运行读取
+    sample_dir = os.path.abspath(os.path.join('build', 'cds-sample'))
+    if os.path.exists(sample_dir):
+        shutil.rmtree(sample_dir)
+    subprocess.run([
+        sys.executable, os.path.join('benchmarks', 'gen_corpus.py'), sample_dir,
+        '--count', '1', '--size', '64K', '--mix', 'vasdolly=1',
+    ], check=True, capture_output=True)
+    sample = os.path.join(sample_dir, sorted(n for n in os.listdir(sample_dir) if n.endswith('.apk'))[0])
+    
+    archive = 'VasDolly.jsa'
+    for name in (archive, CDS_INFO):
+        if os.path.exists(os.path.join('resources', name)):
+            os.remove(os.path.join('resources', name))
+    
+    # 训练运行与JavaRunner的启动参数和读取命令保持一致
+    result = subprocess.run([
+        java,
+        f'-XX:ArchiveClassesAtExit={archive}',
+        *JavaRunner.select_startup_flags(version),
+        '-jar', 'VasDolly.jar',
+        'get', '-c', sample,
+    ], cwd='resources', capture_output=True, text=True)
+    shutil.rmtree(sample_dir, ignore_errors=True)
+    if result.returncode != 0:
+        print(f"  警告: 训练运行失败: {(result.stderr or result.stdout).strip()}")
+    
+    if os.path.exists(os.path.join('resources', archive)):
+        # 归档只能被生成它的JVM构建使用，记录该JVM的版本信息，运行时据此判断是否启用
+        with open(os.path.join('resources', CDS_INFO), 'w', encoding='utf-8') as f:
+            json.dump({'java': java, 'version_output': get_java_version_output(java)}, f, ensure_ascii=False, indent=2)
+        size_kb = os.path.getsize(os.path.join('resources', archive)) / 1024
+        print(f"  输出: resources/{archive} ({size_kb:.0f} KB, Java {version})")
+    else:
+        print("  警告: 归档生成失败")
+
+
+def build(mode='onefile'):
+    """
+    执行打包
+    
+    Args:
+        mode: 'onefile' 单文件，或 'onedir' 目录模式（免解压，启动更快）
+    """
     system = platform.system()
-    print(f"\n开始打包 ({system})...")
+    print(f"\n开始打包 ({system}, {mode})...")
     
     # PyInstaller命令参数
     args = [
         'src/main.py',
         '--name=VasDollyTool',
         # '--windowed',  # 暂时保留控制台窗口，方便调试
-        '--onefile',   # 打包成单文件
+        f'--{mode}',   # 单文件或目录模式
         '--clean',     # 清理临时文件
         '--noconfirm', # 不确认覆盖
     ]
@@ -82,6 +269,15 @@ def build():
             args.append('--add-data=resources/VasDolly.jar:resources')
         print("  包含: VasDolly.jar")
     
+    # 添加AppCDS归档（如果存在），需与jar位于同一目录
+    if os.path.exists('resources/VasDolly.jsa') and os.path.exists(f'resources/{CDS_INFO}'):
+        for name in ('VasDolly.jsa', CDS_INFO):
+            if system == 'Windows':
+                args.append(f'--add-data=resources/{name};resources')
+            else:
+                args.append(f'--add-data=resources/{name}:resources')
+        print("  包含: AppCDS归档")
+    
     # 添加JRE（如果存在）
     if system == 'Windows' and os.path.exists('resources/jre/windows'):
         args.append('--add-data=resources/jre/windows;resources/jre/windows')
@@ -98,23 +294,12 @@ def build():
         args.append('--icon=resources/icons/app_icon.icns')
         print("  包含: 应用图标")
     
-    # 添加隐藏导入（确保所有模块被打包）
-    hidden_imports = [
-        'src',
-        'src.gui',
-        'src.gui.main_window',
-        'src.gui.components',
-        'src.core',
-        'src.core.java_runner',
-        'src.core.channel_parser',
-        'src.utils',
-        'src.utils.logger',
-        'src.utils.file_helper',
-    ]
-    for module in hidden_imports:
-        args.append(f'--hidden-import={module}')
+    # 程序模块全部通过静态导入引用，由PyInstaller从main.py开始分析收集，不再手工列出；
+    # main.py与各模块统一按src下的路径导入（from core.xxx import ...），分析时需包含src目录
+    args.append('--paths=src')
     
-    # 排除不需要的模块（减小体积）
+    # 排除不需要的模块（减小体积和解压量）
+    # 程序只依赖tkinter及标准库中的少量模块，以下模块不会被导入
     exclude_modules = [
         'matplotlib',
         'numpy',
@@ -122,6 +307,24 @@ def build():
         'scipy',
         'PIL',
         'pytest',
+        'setuptools',
+        'pkg_resources',
+        'distutils',
+        'lib2to3',
+        'unittest',
+        'doctest',
+        'pydoc',
+        'pdb',
+        'xmlrpc',
+        'ftplib',
+        'smtplib',
+        'imaplib',
+        'poplib',
+        'nntplib',
+        'telnetlib',
+        'curses',
+        'tkinter.test',
+        'idlelib',
     ]
     for module in exclude_modules:
         args.append(f'--exclude-module={module}')
@@ -136,7 +339,9 @@ def build():
     print("\n打包完成！")
     
     # 输出结果
-    if system == 'Windows':
+    if mode == 'onedir':
+        output = 'dist/VasDollyTool'
+    elif system == 'Windows':
         output = 'dist/VasDollyTool.exe'
     elif system == 'Darwin':
         output = 'dist/VasDollyTool.app'
@@ -213,6 +418,17 @@ https://github.com/Tencent/VasDolly/releases
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='VasDolly工具打包脚本')
+    parser.add_argument(
+        '--mode',
+        choices=['onefile', 'onedir'],
+        default='onefile',
+        help='打包模式：onefile单文件，onedir目录（免解压快速启动）'
+    )
+    parser.add_argument('--jlink', action='store_true', help='使用jlink裁剪内置JRE')
+    parser.add_argument('--cds', action='store_true', help='生成VasDolly.jar的AppCDS归档')
+    options = parser.parse_args()
+    
     print("=" * 60)
     print("VasDolly工具 - 打包脚本")
     print("=" * 60)
@@ -231,8 +447,14 @@ def main():
     # 清理旧文件
     clean_build()
     
+    # 优化JVM启动（精简运行时需先生成，CDS归档依赖最终的运行时）
+    if options.jlink:
+        build_jlink_runtime()
+    if options.cds:
+        generate_cds_archive()
+    
     # 执行打包
-    build()
+    build(options.mode)
     
     print("\n" + "=" * 60)
     print("打包流程完成！")
@@ -241,6 +463,7 @@ def main():
     print("1. 测试运行打包后的程序")
     print("2. 如果需要JRE，请下载并放到resources/jre目录后重新打包")
     print("3. 如果需要自定义图标，请准备.ico/.icns文件后重新打包")
+    print("4. 测量启动耗时: python benchmarks/bench_startup.py <可执行文件>")
 
 
 if __name__ == '__main__':
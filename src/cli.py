@@ -0,0 +1,334 @@
+"""
+命令行入口
+
+使用方法：
+    VasDollyTool scan <APK或目录>... [--catalog 数据库] [--release 版本] [--output 结果.jsonl [--resume]]
+        [--jobs 并发数|auto [--min-jobs 下限] [--max-jobs 上限]]
+    VasDollyTool query --catalog 数据库 (--channel 渠道 | --missing 基准版本 目标版本 | --duplicates)
+    VasDollyTool export --catalog 数据库 --output 文件 [--format csv|jsonl] [--release 版本]
+    VasDollyTool diff <旧版本目录或JSONL> <新版本目录或JSONL> [--jobs 并发数] [--output 报告.json]
+    VasDollyTool shard init <共享队列目录> <APK或目录>... [--shard-size 数量]
+    VasDollyTool shard work <共享队列目录> [--worker-id ID] [--jobs 并发数|auto] [--lease-ttl 秒]
+    VasDollyTool shard status <共享队列目录>
+    VasDollyTool shard merge <共享队列目录> --output 结果.jsonl
+
+全局选项 --trace 文件 记录各阶段耗时，输出可在Perfetto中查看的时间线。
+"""
+import os
+import argparse
+from typing import Dict, List, Optional
+
+from core.channel_diff import ChannelDiff
+from core.channel_parser import ChannelParser
+from core.concurrency_tuner import ConcurrencyTuner
+from core.scan_catalog import ScanCatalog
+from core.scan_journal import ScanJournal
+from core.shard_queue import ShardQueue, run_worker
+from utils.file_helper import FileHelper
+from utils import tracer
+
+
+DEFAULT_CATALOG = 'data/scan_catalog.db'
+# --jobs auto 时的初始并发数
+AUTO_JOBS_INITIAL = 4
+
+
+def expand_apk_paths(inputs: List[str], roots: Optional[Dict[str, str]] = None) -> List[str]:
+    """
+    将命令行传入的文件和目录展开为APK文件列表
+    
+    Args:
+        inputs: 命令行传入的文件和目录
+        roots: 指定时填入 {文件路径: 所属输入目录}；直接传入的文件位于某个输入目录内时以该目录为根，
+            否则以其所在目录为根
+    """
+    dirs = sorted((os.path.abspath(item) for item in inputs if os.path.isdir(item)), key=len, reverse=True)
+    apk_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = FileHelper.find_apk_files(item)
+            apk_paths.extend(found)
+            if roots is not None:
+                roots.update((apk_path, item) for apk_path in found)
+        else:
+            apk_paths.append(item)
+            if roots is not None:
+                path = os.path.abspath(item)
+                roots[item] = next((d for d in dirs if path.startswith(d + os.sep)), os.path.dirname(path))
+    return apk_paths
+
+
+def parse_jobs(value: str):
+    """--jobs参数：正整数或auto"""
+    if value == 'auto':
+        return value
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"应为正整数或auto: {value}")
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"应为正整数或auto: {value}")
+    return jobs
+
+
+def create_tuner(options) -> Optional[ConcurrencyTuner]:
+    """--jobs auto 时按配置文件和命令行的上下限创建自适应并发调节器"""
+    if options.jobs != 'auto':
+        return None
+    return ConcurrencyTuner.from_config(
+        FileHelper.read_json('config/config.json'),
+        AUTO_JOBS_INITIAL,
+        options.min_jobs,
+        options.max_jobs
+    )
+
+
+def print_tuner_report(tuner: ConcurrencyTuner):
+    """输出自适应并发的调节结果"""
+    report = tuner.report()
+    if not report['windows']:
+        print(f"自适应并发: 文件较少，未调整（并发 {report['limit']}）")
+        return
+    print(f"自适应并发: 最终 {report['limit']}，{report['windows']} 个窗口调整 {report['changes']} 次，"
+          f"吞吐最高 {report['best_throughput']:.1f}个/秒（并发 {report['best_limit']}）")
+
+
+def cmd_scan(options) -> int:
+    """扫描APK并输出渠道信息"""
+    roots = {}
+    apk_paths = expand_apk_paths(options.inputs, roots)
+    if not apk_paths:
+        print("未找到APK文件")
+        return 1
+    
+    if options.resume and not options.output:
+        print("--resume 需要同时指定 --output")
+        return 1
+    
+    parser = ChannelParser(shadow_rate=options.shadow)
+    tuner = create_tuner(options)
+    catalog = ScanCatalog(options.catalog) if options.catalog else None
+    # 结果边解析边追加到输出文件，中断后可用 --resume 继续
+    journal = ScanJournal(options.output, resume=options.resume) if options.output else None
+    try:
+        results = parser.batch_parse(
+            apk_paths,
+            catalog=catalog,
+            release=options.release,
+            jobs=options.jobs if tuner is None else tuner.limit,
+            io_jobs=options.io_jobs,
+            journal=journal,
+            tuner=tuner
+        )
+    finally:
+        if catalog:
+            catalog.close()
+        if journal:
+            journal.close()
+    
+    failed = 0
+    with tracer.span('write_output', 'io', files=len(results)):
+        for apk_path, result in results.items():
+            if result['success']:
+                print(f"{apk_path}\t{result['data'].get('channel', '')}")
+            else:
+                failed += 1
+                print(f"{apk_path}\t失败: {result['error']}")
+        if journal:
+            journal.finalize(apk_paths, results, roots)
+    
+    print(f"\n共 {len(results)} 个APK，失败 {failed} 个")
+    if tuner is not None:
+        print_tuner_report(tuner)
+    if parser.shadow is not None:
+        print_shadow_report(parser.shadow)
+    return 1 if failed else 0
+
+
+def print_shadow_report(shadow):
+    """等待后台对比完成并输出影子验证统计"""
+    shadow.drain()
+    report = shadow.report()
+    if report['compared']:
+        print(f"影子验证: 对比 {report['compared']} 个，一致率 {report['agreement_rate']:.2%}，"
+              f"进程内 {report['native_ms']:.2f}ms / VasDolly.jar {report['java_ms']:.1f}ms")
+    else:
+        print(f"影子验证: 采样 {report['sampled']} 个，无有效对比")
+    if report['mismatched']:
+        print(f"  不一致 {report['mismatched']} 个，详见 {shadow.log_path}")
+    if report['fallback']:
+        print("  不一致比例超过阈值，已切换为VasDolly.jar解析")
+
+
+def cmd_query(options) -> int:
+    """查询扫描目录"""
+    catalog = ScanCatalog(options.catalog)
+    try:
+        if options.channel:
+            for record in catalog.query_channel(options.channel, options.release):
+                print(f"{record['path']}\t{record['release'] or ''}\t{record['size']}")
+        elif options.missing:
+            for channel in catalog.missing_channels(*options.missing):
+                print(channel)
+        elif options.duplicates:
+            groups = catalog.duplicates(options.duplicates, options.release)
+            for key, paths in groups.items():
+                print(key)
+                for path in paths:
+                    print(f"  {path}")
+    finally:
+        catalog.close()
+    return 0
+
+
+def cmd_export(options) -> int:
+    """导出扫描目录"""
+    catalog = ScanCatalog(options.catalog)
+    try:
+        count = catalog.export(options.output, options.format, options.release)
+    finally:
+        catalog.close()
+    print(f"已导出 {count} 条记录: {options.output}")
+    return 0
+
+
+def cmd_diff(options) -> int:
+    """比较两个版本的渠道集合，存在差异时返回1"""
+    report = ChannelDiff(jobs=options.jobs).compare(options.old, options.new)
+    
+    if options.output:
+        FileHelper.write_json(options.output, report)
+    
+    stats = report['stats']
+    print(f"旧版本 {stats['old_files']} 个文件，新版本 {stats['new_files']} 个文件")
+    print(f"解析 {stats['parsed']} 个，复用 {stats['reused']} 个\n")
+    
+    for channel in report['added']:
+        print(f"+ {channel}")
+    for channel in report['removed']:
+        print(f"- {channel}")
+    for item in report['renamed']:
+        print(f"~ {item['old']} -> {item['new']}")
+    for channel, paths in report['duplicated']['new'].items():
+        print(f"! 渠道重复 {channel}: {', '.join(paths)}")
+    for item in report['changed_files']:
+        print(f"* {item['file']}: {item['old']} -> {item['new']}")
+    for side in ('old', 'new'):
+        for path in report['failed'][side]:
+            print(f"? 解析失败 ({side}) {path}")
+    
+    if not ChannelDiff.has_differences(report):
+        print("渠道集合一致")
+        return 0
+    return 1
+
+
+def cmd_shard(options) -> int:
+    """多节点分片扫描"""
+    queue = ShardQueue(options.queue, lease_ttl=getattr(options, 'lease_ttl', 300))
+    
+    if options.action == 'init':
+        apk_paths = [os.path.abspath(p) for p in expand_apk_paths(options.inputs)]
+        count = queue.publish(apk_paths, options.shard_size)
+        print(f"已创建 {count} 个分片，共 {len(apk_paths)} 个APK")
+    elif options.action == 'work':
+        tuner = create_tuner(options)
+        jobs = options.jobs if tuner is None else tuner.limit
+        processed = run_worker(queue, ChannelParser(), options.worker_id, jobs, tuner=tuner)
+        print(f"本节点处理了 {processed} 个分片")
+    elif options.action == 'status':
+        status = queue.status()
+        print(f"待处理 {status['todo']}，处理中 {status['leases']}，已完成 {status['done']}")
+    elif options.action == 'merge':
+        if not queue.is_finished():
+            print("警告: 仍有分片未完成，合并结果不完整")
+        count = queue.merge(options.output)
+        print(f"已合并 {count} 条记录: {options.output}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='VasDollyTool', description='VasDolly渠道解析工具')
+    parser.add_argument('--trace', metavar='FILE', help='记录时间线并写入Chrome trace JSON（{pid}替换为进程号）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    scan = subparsers.add_parser('scan', help='扫描APK渠道信息')
+    scan.add_argument('inputs', nargs='+', help='APK文件或目录')
+    scan.add_argument('--catalog', help='扫描目录数据库，指定后增量扫描并保存结果')
+    scan.add_argument('--release', help='写入扫描目录时的版本标识')
+    scan.add_argument('--output', help='将结果写入JSONL文件（边扫描边追加，同时作为检查点）')
+    scan.add_argument('--resume', action='store_true', help='从--output中已有的结果继续，跳过未变化的文件')
+    scan.add_argument('--jobs', type=parse_jobs, default=4, help='并发解析数，auto表示按实测吞吐自动调整')
+    scan.add_argument('--min-jobs', type=int, help='--jobs auto 时的并发下限（默认读取配置，否则为1）')
+    scan.add_argument('--max-jobs', type=int, help='--jobs auto 时的并发上限（默认读取配置，否则为16）')
+    scan.add_argument('--io-jobs', type=int, help='每个存储设备同时读取的文件数，默认按设备类型（网络存储、机械硬盘较低）')
+    scan.add_argument('--shadow', type=float, metavar='RATE', help='影子验证采样率（0~1），按比例用VasDolly.jar复核结果')
+    scan.set_defaults(func=cmd_scan)
+    
+    query = subparsers.add_parser('query', help='查询扫描目录')
+    query.add_argument('--catalog', default=DEFAULT_CATALOG, help='扫描目录数据库')
+    query.add_argument('--release', help='限定版本')
+    group = query.add_mutually_exclusive_group(required=True)
+    group.add_argument('--channel', help='列出指定渠道的所有APK')
+    group.add_argument('--missing', nargs=2, metavar=('BASE', 'TARGET'), help='列出BASE版本有而TARGET版本缺失的渠道')
+    group.add_argument('--duplicates', choices=['fingerprint', 'channel'], help='列出重复的文件或渠道')
+    query.set_defaults(func=cmd_query)
+    
+    export = subparsers.add_parser('export', help='导出扫描目录')
+    export.add_argument('--catalog', default=DEFAULT_CATALOG, help='扫描目录数据库')
+    export.add_argument('--output', required=True, help='输出文件')
+    export.add_argument('--format', choices=['csv', 'jsonl'], default='jsonl', help='导出格式')
+    export.add_argument('--release', help='只导出指定版本')
+    export.set_defaults(func=cmd_export)
+    
+    diff = subparsers.add_parser('diff', help='比较两个版本的渠道集合')
+    diff.add_argument('old', help='旧版本APK目录或JSONL结果文件')
+    diff.add_argument('new', help='新版本APK目录或JSONL结果文件')
+    diff.add_argument('--jobs', type=int, default=4, help='并发解析数')
+    diff.add_argument('--output', help='将完整报告写入JSON文件')
+    diff.set_defaults(func=cmd_diff)
+    
+    shard = subparsers.add_parser('shard', help='多节点分片扫描（共享目录工作队列）')
+    shard_actions = shard.add_subparsers(dest='action', required=True)
+    shard_init = shard_actions.add_parser('init', help='切分任务并写入共享队列')
+    shard_init.add_argument('queue', help='共享队列目录')
+    shard_init.add_argument('inputs', nargs='+', help='APK文件或目录')
+    shard_init.add_argument('--shard-size', type=int, default=500, help='每个分片的APK数量')
+    shard_work = shard_actions.add_parser('work', help='领取并处理分片，直到全部完成')
+    shard_work.add_argument('queue', help='共享队列目录')
+    shard_work.add_argument('--worker-id', help='节点ID，默认为 主机名-进程号；其中的@和/会替换为_')
+    shard_work.add_argument('--jobs', type=parse_jobs, default=4, help='分片内并发解析数，auto表示按实测吞吐自动调整')
+    shard_work.add_argument('--min-jobs', type=int, help='--jobs auto 时的并发下限')
+    shard_work.add_argument('--max-jobs', type=int, help='--jobs auto 时的并发上限')
+    shard_work.add_argument('--lease-ttl', type=float, default=300, help='租约有效期（秒）')
+    shard_status = shard_actions.add_parser('status', help='查看队列进度')
+    shard_status.add_argument('queue', help='共享队列目录')
+    shard_merge = shard_actions.add_parser('merge', help='合并所有分片结果')
+    shard_merge.add_argument('queue', help='共享队列目录')
+    shard_merge.add_argument('--output', required=True, help='输出JSONL文件')
+    shard.set_defaults(func=cmd_shard)
+    
+    return parser
+
+
+def run_cli(argv: List[str]) -> int:
+    """
+    执行命令行
+    
+    Args:
+        argv: 命令行参数（不含程序名）
+    
+    Returns:
+        进程退出码
+    """
+    options = build_parser().parse_args(argv)
+    if options.trace:
+        tracer.enable(options.trace)
+    try:
+        return options.func(options)
+    except Exception as e:
+        print(f"错误: {str(e)}")
+        return 1
+    finally:
+        tracer.save()
@@ -0,0 +1,463 @@
+"""APK签名块渠道读取模块（纯Python，无需Java）"""
+import io
+import os
+import struct
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+from core import channel_decoders
+from core.channel_decoders import SIGNATURE_SCHEME_IDS
+from utils.logger import logger
+
+
+# ZIP结构常量
+EOCD_MAGIC = b'PK\x05\x06'
+EOCD_SIZE = 22
+MAX_COMMENT_SIZE = 0xFFFF
+
+# ZIP64结构常量
+ZIP64_LOCATOR_MAGIC = b'PK\x06\x07'
+ZIP64_LOCATOR_SIZE = 20
+ZIP64_EOCD_MAGIC = b'PK\x06\x06'
+ZIP64_EOCD_SIZE = 56
+
+# VasDolly V1方案：渠道写在EOCD注释中，格式为 渠道内容 + 内容长度(short, 小端) + 魔数
+V1_MAGIC = b'ltlovezh'
+V1_TRAILER_SIZE = 2 + len(V1_MAGIC)
+
+# APK Signing Block常量
+APK_SIG_BLOCK_MAGIC = b'APK Sig Block 42'
+APK_SIG_BLOCK_MIN_SIZE = 32
+
+# 结构上限：文件中声明的长度超过上限时视为损坏或恶意构造，立即失败而不是按声明分配内存
+# 正常APK的签名块（v2/v3签名、证书链、渠道）通常只有几KB到几百KB
+MAX_SIGNING_BLOCK_SIZE = 16 * 1024 * 1024
+MAX_SIGNING_BLOCK_PAIRS = 1024
+MAX_CHANNEL_VALUE_SIZE = 64 * 1024
+
+# ApkFormatError错误码
+ERROR_INVALID = 'invalid'
+ERROR_UNSUPPORTED_SOURCE = 'unsupported_source'
+ERROR_OUT_OF_BOUNDS = 'out_of_bounds'
+ERROR_SHORT_READ = 'short_read'
+ERROR_TOO_SMALL = 'too_small'
+ERROR_NO_EOCD = 'no_eocd'
+ERROR_BAD_CENTRAL_DIRECTORY = 'bad_central_directory'
+ERROR_BAD_ZIP64 = 'bad_zip64'
+ERROR_BLOCK_TOO_LARGE = 'block_too_large'
+ERROR_BAD_SIGNING_BLOCK = 'bad_signing_block'
+ERROR_BAD_PAIR = 'bad_pair'
+ERROR_TOO_MANY_PAIRS = 'too_many_pairs'
+ERROR_BAD_V1_CHANNEL = 'bad_v1_channel'
+
+
+class ApkFormatError(Exception):
+    """APK结构无效，code为错误码（见 ERROR_* 常量）"""
+    
+    def __init__(self, message: str, code: str = ERROR_INVALID):
+        super().__init__(message)
+        self.code = code
+
+
+class BufferSource:
+    """
+    内存数据源：bytes、bytearray、memoryview、mmap
+    
+    read_at返回原数据的memoryview切片，不复制数据。
+    """
+    
+    def __init__(self, data):
+        try:
+            # 非连续或多维的缓冲区无法按字节展开
+            self._view = memoryview(data).cast('B')
+        except (TypeError, ValueError) as e:
+            raise ApkFormatError(f"不支持的缓冲区: {str(e)}", ERROR_UNSUPPORTED_SOURCE)
+        self.size = len(self._view)
+    
+    def read_at(self, offset: int, length: int) -> memoryview:
+        if offset < 0 or length < 0 or offset + length > self.size:
+            raise ApkFormatError(f"读取越界: offset={offset}, length={length}, size={self.size}", ERROR_OUT_OF_BOUNDS)
+        return self._view[offset:offset + length]
+    
+    def close(self):
+        # 释放视图，否则mmap等底层对象无法关闭
+        self._view.release()
+
+
+class PathSource:
+    """
+    文件路径数据源，使用os.pread按偏移读取
+    
+    不移动文件指针、不映射整个文件，内存占用只取决于读取的结构大小，与文件大小无关。
+    """
+    
+    def __init__(self, path: str, advise: bool = False):
+        """
+        Args:
+            path: 文件路径
+            advise: 是否向内核提示访问模式：打开时预读文件尾部，关闭时释放页缓存，
+                批量扫描时避免挤掉构建产物等其他文件的缓存
+        """
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        try:
+            self.size = os.fstat(self._fd).st_size
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._advise = advise and hasattr(os, 'posix_fadvise')
+        if self._advise:
+            tail = min(self.size, EOCD_SIZE + MAX_COMMENT_SIZE)
+            self._fadvise(self.size - tail, tail, os.POSIX_FADV_WILLNEED)
+    
+    def _fadvise(self, offset: int, length: int, advice: int):
+        try:
+            os.posix_fadvise(self._fd, offset, length, advice)
+        except OSError:
+            # 部分文件系统不支持，提示失败不影响读取
+            self._advise = False
+    
+    def read_at(self, offset: int, length: int) -> memoryview:
+        if offset < 0 or length < 0 or offset + length > self.size:
+            raise ApkFormatError(f"读取越界: offset={offset}, length={length}, size={self.size}", ERROR_OUT_OF_BOUNDS)
+        data = os.pread(self._fd, length, offset)
+        if len(data) != length:
+            raise ApkFormatError(f"读取不完整: 期望 {length} 字节，实际 {len(data)} 字节", ERROR_SHORT_READ)
+        return memoryview(data)
+    
+    def close(self):
+        if self._advise:
+            self._fadvise(0, 0, os.POSIX_FADV_DONTNEED)
+        os.close(self._fd)
+
+
+class FileObjectSource:
+    """
+    可随机访问的二进制文件对象数据源
+    
+    只读取定位渠道所需的少量结构（文件尾部和签名块），不读取整个文件。
+    读取结束后恢复文件对象原来的位置。
+    """
+    
+    def __init__(self, fileobj, owned: bool = False):
+        """
+        Args:
+            fileobj: 二进制文件对象
+            owned: 是否由数据源负责关闭文件
+        """
+        if not fileobj.seekable():
+            raise ApkFormatError("文件对象不支持随机访问", ERROR_UNSUPPORTED_SOURCE)
+        self._file = fileobj
+        self._owned = owned
+        self._origin = fileobj.tell()
+        self.size = fileobj.seek(0, io.SEEK_END)
+    
+    def read_at(self, offset: int, length: int) -> memoryview:
+        if offset < 0 or length < 0 or offset + length > self.size:
+            raise ApkFormatError(f"读取越界: offset={offset}, length={length}, size={self.size}", ERROR_OUT_OF_BOUNDS)
+        self._file.seek(offset)
+        data = self._file.read(length)
+        if len(data) != length:
+            raise ApkFormatError(f"读取不完整: 期望 {length} 字节，实际 {len(data)} 字节", ERROR_SHORT_READ)
+        return memoryview(data)
+    
+    def close(self):
+        if self._owned:
+            self._file.close()
+        else:
+            self._file.seek(self._origin)
+
+
+def open_source(source) -> Union[BufferSource, PathSource, FileObjectSource]:
+    """根据输入类型创建数据源"""
+    if isinstance(source, (BufferSource, PathSource, FileObjectSource)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        if hasattr(os, 'pread'):
+            return PathSource(source)
+        # Windows没有pread，退化为seek+read
+        return FileObjectSource(open(source, 'rb'), owned=True)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BufferSource(source)
+    if hasattr(source, 'seek') and hasattr(source, 'read'):
+        # mmap同时支持缓冲区协议和文件接口，优先按缓冲区处理以避免复制
+        try:
+            return BufferSource(source)
+        except TypeError:
+            return FileObjectSource(source)
+    raise ApkFormatError(f"不支持的数据类型: {type(source).__name__}", ERROR_UNSUPPORTED_SOURCE)
+
+
+class ApkReader:
+    """
+    APK结构读取器
+    
+    定位ZIP中央目录结束记录（EOCD），进而定位APK Signing Block，
+    遍历其中的ID-值对。
+    """
+    
+    def __init__(self, source):
+        """
+        Args:
+            source: 文件路径、bytes、bytearray、memoryview、mmap或可随机访问的二进制文件对象
+        """
+        self.source = open_source(source)
+        self.size = self.source.size
+        self._eocd = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        self.source.close()
+    
+    def find_eocd(self) -> Tuple[int, int]:
+        """
+        从文件尾部向前查找EOCD记录
+        
+        搜索范围不超过 22 + 65535 字节（EOCD最大长度）。
+        
+        Returns:
+            (EOCD偏移, 注释长度)
+        """
+        if self._eocd is None:
+            self._eocd = self._search_eocd()
+        return self._eocd
+    
+    def _search_eocd(self) -> Tuple[int, int]:
+        """在文件尾部有界范围内查找EOCD"""
+        if self.size < EOCD_SIZE:
+            raise ApkFormatError("文件过小，不是有效的ZIP", ERROR_TOO_SMALL)
+        
+        tail_size = min(self.size, EOCD_SIZE + MAX_COMMENT_SIZE)
+        tail_offset = self.size - tail_size
+        tail = self.source.read_at(tail_offset, tail_size)
+        
+        # 绝大多数APK没有注释，EOCD就在最后22字节
+        pos = tail_size - EOCD_SIZE
+        if tail[pos:pos + 4] == EOCD_MAGIC and struct.unpack_from('<H', tail, pos + 20)[0] == 0:
+            return tail_offset + pos, 0
+        
+        # 从后向前查找，注释长度字段必须与实际剩余长度一致
+        data = tail.tobytes()
+        pos = data.rfind(EOCD_MAGIC, 0, tail_size - EOCD_SIZE + 4)
+        while pos >= 0:
+            comment_size = struct.unpack_from('<H', data, pos + 20)[0]
+            if pos + EOCD_SIZE + comment_size == tail_size:
+                return tail_offset + pos, comment_size
+            pos = data.rfind(EOCD_MAGIC, 0, pos + 3)
+        
+        raise ApkFormatError("未找到ZIP中央目录结束记录", ERROR_NO_EOCD)
+    
+    def find_central_directory(self) -> Tuple[int, int]:
+        """
+        定位中央目录，支持ZIP64（超过4GB或65535个条目的APK）
+        
+        Returns:
+            (中央目录偏移, 中央目录大小)
+        """
+        eocd_offset, _ = self.find_eocd()
+        eocd = self.source.read_at(eocd_offset, EOCD_SIZE)
+        cd_size, cd_offset = struct.unpack_from('<II', eocd, 12)
+        cd_end = eocd_offset
+        
+        zip64 = self._find_zip64_eocd(eocd_offset)
+        if zip64 is not None:
+            zip64_offset, cd_size, cd_offset = zip64
+            cd_end = zip64_offset
+        elif cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF:
+            raise ApkFormatError("EOCD要求ZIP64，但未找到ZIP64定位记录", ERROR_BAD_ZIP64)
+        
+        if cd_offset + cd_size > cd_end:
+            raise ApkFormatError("中央目录位置无效", ERROR_BAD_CENTRAL_DIRECTORY)
+        return cd_offset, cd_size
+    
+    def _find_zip64_eocd(self, eocd_offset: int) -> Optional[Tuple[int, int, int]]:
+        """
+        读取紧邻EOCD之前的ZIP64定位记录及其指向的ZIP64 EOCD
+        
+        Returns:
+            (ZIP64 EOCD偏移, 中央目录大小, 中央目录偏移)，不是ZIP64时返回None
+        """
+        if eocd_offset < ZIP64_LOCATOR_SIZE:
+            return None
+        locator = self.source.read_at(eocd_offset - ZIP64_LOCATOR_SIZE, ZIP64_LOCATOR_SIZE)
+        if locator[0:4] != ZIP64_LOCATOR_MAGIC:
+            return None
+        
+        zip64_offset = struct.unpack_from('<Q', locator, 8)[0]
+        if zip64_offset + ZIP64_EOCD_SIZE > eocd_offset - ZIP64_LOCATOR_SIZE:
+            raise ApkFormatError(f"ZIP64 EOCD偏移无效: {zip64_offset}", ERROR_BAD_ZIP64)
+        
+        record = self.source.read_at(zip64_offset, ZIP64_EOCD_SIZE)
+        if record[0:4] != ZIP64_EOCD_MAGIC:
+            raise ApkFormatError("ZIP64 EOCD签名无效", ERROR_BAD_ZIP64)
+        cd_size, cd_offset = struct.unpack_from('<QQ', record, 40)
+        return zip64_offset, cd_size, cd_offset
+    
+    def find_signing_block(self) -> Optional[Tuple[int, int]]:
+        """
+        定位APK Signing Block（紧邻中央目录之前）
+        
+        Returns:
+            (ID-值对区域起始偏移, 区域长度)，APK没有签名块时返回None
+        """
+        cd_offset, _ = self.find_central_directory()
+        if cd_offset < APK_SIG_BLOCK_MIN_SIZE:
+            return None
+        
+        footer = self.source.read_at(cd_offset - 24, 24)
+        if footer[8:24] != APK_SIG_BLOCK_MAGIC:
+            return None
+        
+        block_size = struct.unpack_from('<Q', footer, 0)[0]
+        if block_size > MAX_SIGNING_BLOCK_SIZE:
+            raise ApkFormatError(f"签名块过大: {block_size}", ERROR_BLOCK_TOO_LARGE)
+        if block_size < 24 or block_size + 8 > cd_offset:
+            raise ApkFormatError(f"签名块大小无效: {block_size}", ERROR_BAD_SIGNING_BLOCK)
+        
+        block_offset = cd_offset - block_size - 8
+        header = self.source.read_at(block_offset, 8)
+        if struct.unpack_from('<Q', header, 0)[0] != block_size:
+            raise ApkFormatError("签名块头尾大小不一致", ERROR_BAD_SIGNING_BLOCK)
+        
+        return block_offset + 8, block_size - 24
+    
+    def iter_signing_block(self) -> Iterator[Tuple[int, memoryview]]:
+        """
+        遍历签名块中的ID-值对
+        
+        Yields:
+            (ID, 值)，值为memoryview
+        """
+        location = self.find_signing_block()
+        if location is None:
+            return
+        pairs_offset, pairs_size = location
+        pairs = self.source.read_at(pairs_offset, pairs_size)
+        
+        pos = 0
+        count = 0
+        while pos < pairs_size:
+            count += 1
+            if count > MAX_SIGNING_BLOCK_PAIRS:
+                raise ApkFormatError(f"签名块ID-值对超过 {MAX_SIGNING_BLOCK_PAIRS} 个", ERROR_TOO_MANY_PAIRS)
+            if pairs_size - pos < 12:
+                raise ApkFormatError("签名块ID-值对不完整", ERROR_BAD_PAIR)
+            pair_size = struct.unpack_from('<Q', pairs, pos)[0]
+            if pair_size < 4 or pair_size > pairs_size - pos - 8:
+                raise ApkFormatError(f"签名块ID-值对长度无效: {pair_size}", ERROR_BAD_PAIR)
+            pair_id = struct.unpack_from('<I', pairs, pos + 8)[0]
+            yield pair_id, pairs[pos + 12:pos + 8 + pair_size]
+            pos += 8 + pair_size
+    
+    def read_v1_channel(self) -> Optional[str]:
+        """
+        读取VasDolly V1方案写在ZIP注释中的渠道
+        
+        Returns:
+            渠道名，注释中没有VasDolly魔数时返回None
+        """
+        eocd_offset, comment_size = self.find_eocd()
+        if comment_size < V1_TRAILER_SIZE:
+            return None
+        
+        comment = self.source.read_at(eocd_offset + EOCD_SIZE, comment_size)
+        if comment[-len(V1_MAGIC):] != V1_MAGIC:
+            return None
+        
+        length = struct.unpack_from('<h', comment, comment_size - V1_TRAILER_SIZE)[0]
+        if length <= 0 or length > comment_size - V1_TRAILER_SIZE:
+            raise ApkFormatError(f"V1渠道长度无效: {length}", ERROR_BAD_V1_CHANNEL)
+        
+        end = comment_size - V1_TRAILER_SIZE
+        try:
+            return str(comment[end - length:end], 'utf-8')
+        except UnicodeDecodeError:
+            raise ApkFormatError("V1渠道不是有效的UTF-8", ERROR_BAD_V1_CHANNEL)
+    
+    def read_channel_info(self) -> Dict[str, Any]:
+        """
+        单次遍历签名块，用已注册的解码器解码所有ID-值对
+        
+        签名块中没有任何渠道时，再读取V1方案的注释渠道（与VasDolly先V2后V1的顺序一致）。
+        
+        Returns:
+            {
+                'channel': 优先级最高的厂商给出的渠道，没有时为None,
+                'vendor': 该渠道所属厂商,
+                'channels': {厂商: 渠道},
+                'extras': 解码得到的其他键值对,
+                'schemes': 签名块中存在的签名方案（v2、v3等）,
+            }
+        """
+        channels = {}
+        extras = {}
+        schemes = []
+        
+        for pair_id, value in self.iter_signing_block():
+            if pair_id in SIGNATURE_SCHEME_IDS:
+                schemes.append(SIGNATURE_SCHEME_IDS[pair_id])
+                continue
+            registered = channel_decoders.get_decoder(pair_id)
+            if registered is None:
+                continue
+            vendor, decoder = registered
+            if len(value) > MAX_CHANNEL_VALUE_SIZE:
+                logger.warning(f"{vendor} 渠道数据过大 (0x{pair_id:08x}): {len(value)} 字节，已忽略")
+                continue
+            try:
+                decoded = dict(decoder(value))
+            except Exception as e:
+                logger.warning(f"{vendor} 渠道数据解码失败 (0x{pair_id:08x}): {str(e)}")
+                continue
+            channel = decoded.pop('channel', None)
+            if channel:
+                channels[vendor] = channel
+            extras.update(decoded)
+        
+        vendor = next((v for v in channel_decoders.vendor_priority() if v in channels), None)
+        if vendor is None:
+            v1_channel = self.read_v1_channel()
+            if v1_channel:
+                vendor = 'vasdolly-v1'
+                channels[vendor] = v1_channel
+        return {
+            'channel': channels.get(vendor),
+            'vendor': vendor,
+            'channels': channels,
+            'extras': extras,
+            'schemes': schemes,
+        }
+    
+    def read_channel(self) -> Optional[str]:
+        """读取渠道，没有渠道时返回None"""
+        return self.read_channel_info()['channel']
+
+
+def read_channel_info(source) -> Dict[str, Any]:
+    """
+    读取签名块中所有已注册格式的渠道和附加信息（见ApkReader.read_channel_info）
+    
+    Args:
+        source: 文件路径、bytes、bytearray、memoryview、mmap或可随机访问的二进制文件对象
+    """
+    with ApkReader(source) as reader:
+        return reader.read_channel_info()
+
+
+def read_channel(source) -> Optional[str]:
+    """
+    从内存数据或文件对象中读取渠道
+    
+    Args:
+        source: 文件路径、bytes、bytearray、memoryview、mmap或可随机访问的二进制文件对象
+    
+    Returns:
+        渠道名，没有渠道时返回None
+    
+    Raises:
+        ApkFormatError: 数据不是有效的APK
+    """
+    with ApkReader(source) as reader:
+        return reader.read_channel()
@@ -0,0 +1,93 @@
+"""签名块渠道解码器注册表模块"""
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+from utils.logger import logger
+
+
+# 签名方案使用的ID（只记录存在与否，不解码）
+SIGNATURE_SCHEME_IDS = {
+    0x7109871a: 'v2',
+    0xf05368c0: 'v3',
+    0x1b93ad61: 'v3.1',
+    0x2b09189e: 'source-stamp',
+    0x6dff800d: 'source-stamp-v2',
+}
+
+# 签名块对齐填充使用的ID
+PADDING_ID = 0x42726577
+
+VASDOLLY_CHANNEL_ID = 0x881155ff
+WALLE_CHANNEL_ID = 0x71777777
+
+Decoder = Callable[[memoryview], Dict[str, str]]
+
+# {ID: (厂商名, 解码函数)}，注册顺序即渠道优先级
+_decoders: "OrderedDict[int, tuple]" = OrderedDict()
+
+
+def register_decoder(block_id: int, vendor: str, decoder: Decoder):
+    """
+    注册签名块ID的解码器
+    
+    Args:
+        block_id: 签名块中的ID
+        vendor: 厂商名（如 vasdolly、walle）
+        decoder: 解码函数，接收值的memoryview，返回键值对字典，渠道使用 'channel' 键
+    """
+    if block_id in SIGNATURE_SCHEME_IDS or block_id == PADDING_ID:
+        raise Exception(f"ID 0x{block_id:08x} 为签名方案保留ID")
+    _decoders[block_id] = (vendor, decoder)
+    logger.debug(f"注册渠道解码器: {vendor} (0x{block_id:08x})")
+
+
+def unregister_decoder(block_id: int):
+    """移除解码器"""
+    _decoders.pop(block_id, None)
+
+
+def get_decoder(block_id: int) -> Optional[tuple]:
+    """获取ID对应的 (厂商名, 解码函数)"""
+    return _decoders.get(block_id)
+
+
+def vendor_priority() -> List[str]:
+    """按优先级排列的厂商名"""
+    return [vendor for vendor, _ in _decoders.values()]
+
+
+def decode_text(value: memoryview) -> Dict[str, str]:
+    """值为UTF-8渠道名（VasDolly格式）"""
+    return {'channel': str(value, 'utf-8')}
+
+
+def decode_json(value: memoryview) -> Dict[str, str]:
+    """值为JSON对象（Walle格式），channel字段为渠道，其余字段作为附加信息"""
+    data = json.loads(str(value, 'utf-8'))
+    if not isinstance(data, dict):
+        raise ValueError("JSON值不是对象")
+    return {str(k): str(v) for k, v in data.items()}
+
+
+def register_config_decoders(config: Dict):
+    """
+    从配置中注册自定义ID
+    
+    配置格式：
+        "channel_decoders": [
+            {"id": "0x7a6e0001", "vendor": "internal", "format": "text"}
+        ]
+    format 为 text（UTF-8渠道名）或 json（JSON键值对）。
+    """
+    formats = {'text': decode_text, 'json': decode_json}
+    for entry in config.get('channel_decoders') or []:
+        try:
+            block_id = int(str(entry['id']), 0)
+            decoder = formats[entry.get('format', 'text')]
+            register_decoder(block_id, entry.get('vendor', f'0x{block_id:08x}'), decoder)
+        except Exception as e:
+            logger.warning(f"忽略无效的渠道解码器配置 {entry}: {str(e)}")
+
+
+register_decoder(VASDOLLY_CHANNEL_ID, 'vasdolly', decode_text)
+register_decoder(WALLE_CHANNEL_ID, 'walle', decode_json)
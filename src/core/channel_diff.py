@@ -0,0 +1,213 @@
+"""版本间渠道差异比较模块"""
+import os
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from core.channel_parser import ChannelParser
+from core.scan_record import NO_CHANNEL
+from utils.logger import logger
+from utils.file_helper import FileHelper
+
+
+class ChannelDiff:
+    """
+    比较两个版本的渠道集合
+    
+    每一侧可以是APK目录，也可以是之前保存的JSONL扫描结果。
+    两侧相对路径、大小、修改时间均一致的文件只解析一次（或直接复用JSONL中的结果），
+    其余文件合并为一个批次并发解析。
+    """
+    
+    def __init__(self, parser: Optional[ChannelParser] = None, jobs: int = 4):
+        """
+        Args:
+            parser: 渠道解析器，为None时在需要解析时创建
+            jobs: 并发解析数
+        """
+        self.parser = parser
+        self.jobs = jobs
+    
+    def compare(self, old_source: str, new_source: str) -> Dict[str, Any]:
+        """
+        比较两个版本
+        
+        Args:
+            old_source: 旧版本目录或JSONL文件
+            new_source: 新版本目录或JSONL文件
+        
+        Returns:
+            差异报告字典
+        """
+        old = self.load_side(old_source)
+        new = self.load_side(new_source)
+        parsed, reused = self._resolve(old, new)
+        
+        report = self._build_report(old, new)
+        report['stats'] = {
+            'old_files': len(old),
+            'new_files': len(new),
+            'parsed': parsed,
+            'reused': reused,
+        }
+        return report
+    
+    def load_side(self, source: str) -> Dict[str, Dict[str, Any]]:
+        """
+        加载一侧的文件列表
+        
+        Returns:
+            {相对路径: 记录}，目录中的文件尚未解析，记录中pending为True
+        """
+        if os.path.isdir(source):
+            entries = {}
+            for apk_path in FileHelper.find_apk_files(source):
+                st = os.stat(apk_path)
+                entries[os.path.relpath(apk_path, source)] = {
+                    'path': os.path.abspath(apk_path),
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'pending': True,
+                }
+            return entries
+        
+        if not os.path.isfile(source):
+            raise Exception(f"找不到目录或结果文件: {source}")
+        
+        records = []
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        if not records:
+            return {}
+        
+        # JSONL中保存的是绝对路径，相对路径以扫描时记录的输入目录（root）为根，
+        # 中断后未整理的输出或分片合并结果没有root时，以所有文件的公共目录为根
+        common_root = os.path.commonpath([os.path.dirname(r['path']) for r in records])
+        entries = {}
+        for record in records:
+            record['pending'] = False
+            entries[os.path.relpath(record['path'], record.get('root') or common_root)] = record
+        return entries
+    
+    def _resolve(self, old: Dict[str, Dict], new: Dict[str, Dict]) -> Tuple[int, int]:
+        """
+        解析两侧尚未解析的文件
+        
+        Returns:
+            (实际解析的文件数, 复用结果的文件数)
+        """
+        to_parse: Dict[str, List[Dict]] = {}
+        reused = 0
+        
+        for side, other in ((old, new), (new, old)):
+            for rel_path, entry in side.items():
+                if not entry['pending']:
+                    continue
+                peer = other.get(rel_path)
+                # 解析失败的记录可能没有大小和修改时间，无法判断是否同一文件，只能重新解析
+                if (peer and peer.get('size') is not None
+                        and peer.get('size') == entry['size'] and peer.get('mtime_ns') == entry['mtime_ns']):
+                    if not peer['pending']:
+                        self._fill(entry, peer)
+                        reused += 1
+                        continue
+                    if peer['path'] in to_parse:
+                        to_parse[peer['path']].append(entry)
+                        reused += 1
+                        continue
+                to_parse.setdefault(entry['path'], []).append(entry)
+        
+        if to_parse:
+            if self.parser is None:
+                self.parser = ChannelParser()
+            logger.info(f"渠道比较: 解析 {len(to_parse)} 个文件，复用 {reused} 个结果")
+            results = self.parser.batch_parse(list(to_parse), jobs=self.jobs)
+            for apk_path, entries in to_parse.items():
+                result = results[apk_path]
+                for entry in entries:
+                    entry['success'] = result['success']
+                    entry['error'] = result.get('error')
+                    channel = (result.get('data') or {}).get('channel')
+                    entry['channel'] = None if channel == NO_CHANNEL else channel
+                    entry['pending'] = False
+        
+        return len(to_parse), reused
+    
+    @staticmethod
+    def _fill(entry: Dict, peer: Dict):
+        """复用另一侧同一文件的解析结果"""
+        entry['success'] = peer.get('success', True)
+        entry['error'] = peer.get('error')
+        entry['channel'] = peer.get('channel')
+        entry['pending'] = False
+    
+    @staticmethod
+    def _channel_map(entries: Dict[str, Dict]) -> Dict[str, List[str]]:
+        """{渠道: [相对路径]}，忽略解析失败和无渠道的文件"""
+        channels: Dict[str, List[str]] = {}
+        for rel_path, entry in sorted(entries.items()):
+            channel = entry.get('channel')
+            if entry.get('success') and channel and channel != NO_CHANNEL:
+                channels.setdefault(channel, []).append(rel_path)
+        return channels
+    
+    @staticmethod
+    def _group_by_template(channels: List[str], channel_map: Dict[str, List[str]]) -> Dict[str, set]:
+        """按去掉渠道名后的路径模板对渠道分组"""
+        groups: Dict[str, set] = {}
+        for channel in channels:
+            for rel_path in channel_map[channel]:
+                if channel in rel_path:
+                    groups.setdefault(rel_path.replace(channel, '\0'), set()).add(channel)
+        return groups
+    
+    def _build_report(self, old: Dict[str, Dict], new: Dict[str, Dict]) -> Dict[str, Any]:
+        """生成差异报告"""
+        old_map = self._channel_map(old)
+        new_map = self._channel_map(new)
+        added = sorted(set(new_map) - set(old_map))
+        removed = sorted(set(old_map) - set(new_map))
+        
+        # 重命名：文件路径中把渠道名替换掉后完全一致，例如 app_huawei.apk -> app_honor.apk
+        # 同一路径模板下恰好删除一个、新增一个渠道时才视为重命名，存在多个候选时无法确定对应关系
+        removed_by_template = self._group_by_template(removed, old_map)
+        added_by_template = self._group_by_template(added, new_map)
+        renamed = []
+        for template, old_channels in removed_by_template.items():
+            new_channels = added_by_template.get(template, set())
+            if len(old_channels) == 1 and len(new_channels) == 1:
+                renamed.append({'old': old_channels.pop(), 'new': new_channels.pop()})
+        renamed.sort(key=lambda item: item['old'])
+        removed = [ch for ch in removed if ch not in {item['old'] for item in renamed}]
+        added = [ch for ch in added if ch not in {item['new'] for item in renamed}]
+        
+        changed = []
+        for rel_path in sorted(set(old) & set(new)):
+            old_channel = old[rel_path].get('channel')
+            new_channel = new[rel_path].get('channel')
+            if old_channel != new_channel:
+                changed.append({'file': rel_path, 'old': old_channel, 'new': new_channel})
+        
+        return {
+            'added': added,
+            'removed': removed,
+            'renamed': renamed,
+            'duplicated': {
+                'old': {ch: paths for ch, paths in old_map.items() if len(paths) > 1},
+                'new': {ch: paths for ch, paths in new_map.items() if len(paths) > 1},
+            },
+            'changed_files': changed,
+            'failed': {
+                'old': sorted(p for p, e in old.items() if not e.get('success', True)),
+                'new': sorted(p for p, e in new.items() if not e.get('success', True)),
+            },
+        }
+    
+    @staticmethod
+    def has_differences(report: Dict[str, Any]) -> bool:
+        """报告中是否存在渠道差异"""
+        return bool(
+            report['added'] or report['removed'] or report['renamed']
+            or report['changed_files'] or report['duplicated']['new']
+        )
@@ -1,24 +1,57 @@
 """渠道解析模块"""
 import os
+import time
+import threading
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Optional
+from core.apk_reader import ApkReader, ApkFormatError, PathSource, read_channel_info
+from core.channel_decoders import register_config_decoders
+from core.concurrency_tuner import ConcurrencyTuner
+from core.io_scheduler import IoScheduler
 from core.java_runner import JavaRunner
+from core.scan_catalog import ScanCatalog
+from core.scan_journal import ScanJournal
+from core.scan_record import make_record, is_unchanged, to_result
+from core.shadow_validator import ShadowValidator
 from utils.logger import logger
 from utils.file_helper import FileHelper
+from utils import tracer
 
 
 class ChannelParser:
     """APK渠道信息解析器"""
     
-    def __init__(self):
-        """初始化解析器"""
+    # 批量解析时每累计多少条结果写入一次扫描目录
+    CATALOG_BATCH_SIZE = 500
+    
+    def __init__(self, shadow_rate: Optional[float] = None):
+        """
+        初始化解析器
+        
+        Args:
+            shadow_rate: 影子验证采样率，指定时覆盖配置文件中的设置，0表示关闭
+        """
         self.runner = JavaRunner()
+        
+        # 注册配置文件中的自定义渠道ID
+        config = FileHelper.read_json('config/config.json')
+        register_config_decoders(config)
+        
+        # 按采样率在后台用VasDolly.jar复核进程内解析结果
+        self.shadow = ShadowValidator.from_config(self._get_channel_java, config, shadow_rate)
+        
+        # 图形界面打开文件对话框时的Java预热
+        self._warm_lock = threading.Lock()
+        self._warm_cancel: Optional[threading.Event] = None
     
-    def get_channel(self, apk_path: str) -> Dict[str, str]:
+    def get_channel(self, apk_path: str, io: Optional[IoScheduler] = None) -> Dict[str, str]:
         """
         解析APK渠道信息
         
         Args:
             apk_path: APK文件路径
+            io: 批量解析时的I/O调度器，读取期间（包括VasDolly.jar兜底）占用文件所在设备的并发名额
             
         Returns:
             渠道信息字典
@@ -26,15 +59,55 @@ class ChannelParser:
         Raises:
             Exception: 解析失败时抛出异常
         """
+        with tracer.span('get_channel', file=os.path.basename(apk_path)) as channel_span:
+            channel_info = self._get_channel(apk_path, io)
+            channel_span.set(channel=channel_info.get('channel'))
+        return channel_info
+    
+    def _get_channel(self, apk_path: str, io: Optional[IoScheduler] = None) -> Dict[str, str]:
+        """get_channel的实现：先进程内读取，未找到渠道时调用VasDolly.jar"""
         # 验证APK文件
         if not FileHelper.is_apk_file(apk_path):
             raise Exception(f"无效的APK文件: {apk_path}")
         
         logger.info(f"开始解析APK渠道: {apk_path}")
         
+        with io.slot(apk_path) if io is not None else nullcontext():
+            return self._read_channel(apk_path)
+    
+    def _read_channel(self, apk_path: str) -> Dict[str, str]:
+        """读取渠道：先进程内读取，必要时交给VasDolly.jar"""
+        # 优先在进程内读取签名块和V1注释，找到渠道时无需启动JVM
+        # 影子验证发现不一致比例超过阈值后，VasDolly渠道改用VasDolly.jar解析
+        fallback = self.shadow is not None and self.shadow.fallback
+        start = time.perf_counter()
+        try:
+            with tracer.span('native_read'):
+                channel_info = self._get_channel_native(apk_path)
+        except ApkFormatError:
+            if not fallback:
+                raise
+            channel_info = None
+        
+        if channel_info is not None:
+            # Walle及配置注册的渠道VasDolly.jar无法读取，不参与对比，也不受回退影响
+            if self.shadow is None or not ShadowValidator.is_comparable(channel_info):
+                return channel_info
+            if not fallback:
+                self.shadow.submit(apk_path, channel_info['channel'], time.perf_counter() - start)
+                return channel_info
+        
+        return self._get_channel_java(apk_path)
+    
+    def _get_channel_java(self, apk_path: str) -> Dict[str, str]:
+        """通过VasDolly.jar解析渠道"""
         # 执行VasDolly get命令
-        args = ['get', '-c', apk_path]
-        stdout, stderr, code = self.runner.run_command(args)
+        args = ['get', '-c']
+        stdout, stderr, code = self.runner.run_command(
+            args,
+            size_hint=os.path.getsize(apk_path),
+            apk_path=apk_path
+        )
         
         if code != 0:
             error_msg = stderr if stderr else "解析失败"
@@ -42,7 +115,8 @@ class ChannelParser:
             raise Exception(f"解析失败: {error_msg}")
         
         # 解析输出
-        channel_info = self._parse_output(stdout)
+        with tracer.span('parse_output'):
+            channel_info = self._parse_output(stdout)
         
         if not channel_info or 'channel' not in channel_info:
             # 可能没有渠道信息
@@ -69,6 +143,126 @@ class ChannelParser:
         logger.debug(f"返回的channel_info字典内容: {filtered_info}")
         return filtered_info
     
+    def _get_channel_native(self, apk_path: str) -> Optional[Dict]:
+        """
+        进程内读取渠道
+        
+        Returns:
+            渠道信息字典；未找到渠道或文件无法读取时返回None，由VasDolly.jar兜底
+        
+        Raises:
+            ApkFormatError: 结构损坏（长度、偏移越界等），直接失败，不再交给VasDolly.jar等待超时
+        """
+        try:
+            # 只读取文件尾部的少量结构，读完即释放页缓存
+            source = PathSource(apk_path, advise=True) if hasattr(os, 'pread') else apk_path
+            info = read_channel_info(source)
+        except ApkFormatError as e:
+            logger.error(f"APK结构无效[{e.code}]: {str(e)}")
+            raise ApkFormatError(f"APK结构无效[{e.code}]: {str(e)}", e.code)
+        except OSError as e:
+            logger.warning(f"进程内解析失败，改用VasDolly.jar: {str(e)}")
+            return None
+        
+        if info['channel'] is None:
+            return None
+        
+        return self._build_channel_info(
+            info,
+            os.path.basename(apk_path),
+            FileHelper.get_file_size(apk_path)
+        )
+    
+    def warm_up(self):
+        """
+        在后台预热VasDolly.jar后端（图形界面打开文件对话框时调用）
+        
+        用户选择文件期间完成JVM库、CDS归档和jar的加载，进程内未找到渠道需要启动Java时
+        少付冷启动开销。已有预热在进行时直接返回；对话框返回后应调用cancel_warm_up()，
+        避免预热进程占用调度器名额、拖慢随后的解析。
+        """
+        with self._warm_lock:
+            if self._warm_cancel is not None:
+                return
+            cancel_event = self._warm_cancel = threading.Event()
+        
+        def run():
+            try:
+                self.runner.warm_up(cancel_event)
+            except Exception as e:
+                logger.debug(f"预热Java失败: {str(e)}")
+            finally:
+                with self._warm_lock:
+                    if self._warm_cancel is cancel_event:
+                        self._warm_cancel = None
+        
+        threading.Thread(target=run, name='java-warm-up', daemon=True).start()
+    
+    def cancel_warm_up(self):
+        """中止正在进行的预热（文件对话框返回或窗口关闭时调用）"""
+        with self._warm_lock:
+            cancel_event, self._warm_cancel = self._warm_cancel, None
+        if cancel_event is not None:
+            cancel_event.set()
+            logger.debug("已取消Java预热")
+    
+    @staticmethod
+    def get_channel_from_stream(source, name: Optional[str] = None) -> Dict[str, str]:
+        """
+        从内存数据或文件对象中解析渠道信息，不写临时文件、不启动Java
+        
+        不依赖Java环境，可直接通过类调用: ChannelParser.get_channel_from_stream(data)
+        
+        Args:
+            source: bytes、bytearray、memoryview、mmap或可随机访问的二进制文件对象
+            name: 显示用的文件名
+        
+        Returns:
+            渠道信息字典，格式与get_channel一致
+        
+        Raises:
+            Exception: 数据不是有效的APK时抛出异常
+        """
+        try:
+            with ApkReader(source) as reader:
+                size = reader.size
+                info = reader.read_channel_info()
+        except ApkFormatError as e:
+            logger.error(f"解析失败: {str(e)}")
+            raise Exception(f"解析失败: {str(e)}")
+        
+        return ChannelParser._build_channel_info(info, name or '<内存数据>', FileHelper.format_size(size))
+    
+    @staticmethod
+    def _build_channel_info(info: Dict, file_name: str, size: str) -> Dict:
+        """将ApkReader.read_channel_info的结果按get_channel的格式组装"""
+        channel = info['channel']
+        if channel is None:
+            logger.warning("APK中未找到渠道信息")
+            return {
+                'channel': '无渠道信息',
+                'status': '该APK未包含渠道标识',
+                'file': file_name,
+                'size': size,
+                'schemes': ','.join(info['schemes'])
+            }
+        
+        logger.info(f"解析成功，渠道: {channel}（{info['vendor']}）")
+        channel_info = {
+            'channel': channel,
+            '详细信息': f"{channel},len={len(channel)}",
+            '长度': str(len(channel)),
+            'file': file_name,
+            'size': size,
+            'vendor': info['vendor'],
+            'schemes': ','.join(info['schemes'])
+        }
+        if len(info['channels']) > 1:
+            channel_info['channels'] = info['channels']
+        if info['extras']:
+            channel_info['extras'] = info['extras']
+        return channel_info
+    
     def _parse_output(self, output: str) -> Dict[str, str]:
         """
         解析VasDolly命令输出
@@ -144,31 +338,179 @@ class ChannelParser:
         logger.info(f"检查APK签名: {apk_path}")
         return True
     
-    def batch_parse(self, apk_paths: list) -> Dict[str, Dict]:
+    def batch_parse(
+        self,
+        apk_paths: list,
+        catalog: Optional[ScanCatalog] = None,
+        release: Optional[str] = None,
+        jobs: int = 1,
+        io_jobs: Optional[int] = None,
+        journal: Optional[ScanJournal] = None,
+        tuner: Optional[ConcurrencyTuner] = None
+    ) -> Dict[str, Dict]:
         """
         批量解析多个APK
         
+        文件按所在设备分组、设备内按inode排序读取，每个设备同时读取的文件数单独限制
+        （网络文件系统和机械硬盘默认较低），避免大量随机读把网络存储拖慢。
+        
         Args:
             apk_paths: APK文件路径列表
+            catalog: 扫描目录，指定时跳过大小和修改时间未变的文件，并将结果增量写入
+            release: 写入扫描目录时使用的版本标识
+            jobs: 并发解析数（实际并发的Java进程数仍受全局调度器限制）
+            io_jobs: 每个设备的并发读取数，为None时按设备类型自动选择
+            journal: 检查点日志，每完成一个文件追加一条记录；已记录且大小和修改时间未变的文件直接复用
+            tuner: 自适应并发调节器，指定时忽略jobs，按实测吞吐在调节器的上下限内调整并发数
             
         Returns:
-            {apk_path: channel_info} 字典
+            {apk_path: channel_info} 字典，顺序与apk_paths一致
         """
+        with tracer.span('batch_parse', files=len(apk_paths), jobs=jobs):
+            return self._batch_parse(apk_paths, catalog, release, jobs, io_jobs, journal, tuner)
+    
+    def _batch_parse(
+        self,
+        apk_paths: list,
+        catalog: Optional[ScanCatalog],
+        release: Optional[str],
+        jobs: int,
+        io_jobs: Optional[int],
+        journal: Optional[ScanJournal],
+        tuner: Optional[ConcurrencyTuner]
+    ) -> Dict[str, Dict]:
+        """batch_parse的实现"""
         results = {}
+        stats = {}
+        pending = []
+        to_parse = []
         
+        cached = {}
+        if catalog is not None:
+            with tracer.span('cache_lookup', 'io', files=len(apk_paths)):
+                cached = catalog.lookup_many([os.path.abspath(p) for p in apk_paths])
         for apk_path in apk_paths:
             try:
-                channel_info = self.get_channel(apk_path)
-                results[apk_path] = {
-                    'success': True,
-                    'data': channel_info
-                }
-            except Exception as e:
-                logger.error(f"解析 {apk_path} 失败: {str(e)}")
-                results[apk_path] = {
-                    'success': False,
-                    'error': str(e)
-                }
+                with tracer.span('stat', 'io'):
+                    st = os.stat(apk_path)
+            except OSError:
+                st = None
+            stats[apk_path] = st
+            if st is None:
+                to_parse.append(apk_path)
+                continue
+            
+            # 上次中断前已写入检查点日志的文件
+            record = journal.get(apk_path) if journal is not None else None
+            if record and is_unchanged(record, st):
+                results[apk_path] = to_result(record)
+                if catalog is not None:
+                    # 中断时可能尚未写入扫描目录
+                    pending.append(record)
+                continue
+            
+            record = cached.get(os.path.abspath(apk_path)) if cached else None
+            if record and is_unchanged(record, st):
+                results[apk_path] = to_result(record)
+                if release is not None and record.get('release') != release:
+                    pending.append(record)
+                if journal is not None:
+                    journal.append({k: v for k, v in record.items() if k != 'release'})
+                continue
+            to_parse.append(apk_path)
         
-        return results
-
+        if journal is not None and len(to_parse) < len(apk_paths):
+            logger.info(f"复用 {len(apk_paths) - len(to_parse)} 个已有结果，待解析 {len(to_parse)} 个")
+        
+        def on_result(apk_path, result):
+            results[apk_path] = result
+            st = stats.get(apk_path)
+            if st is None or (catalog is None and journal is None):
+                return
+            with tracer.span('emit', 'io'):
+                try:
+                    record = make_record(apk_path, result, st)
+                except OSError as e:
+                    # 文件在解析过程中被删除
+                    logger.warning(f"无法记录 {apk_path}: {str(e)}")
+                    return
+                if journal is not None:
+                    journal.append(record)
+                if catalog is not None:
+                    pending.append(record)
+                    if len(pending) >= self.CATALOG_BATCH_SIZE:
+                        catalog.upsert_many(pending, release)
+                        pending.clear()
+        
+        # 调度器只属于本次批量解析，同一解析器上并发的批量任务互不影响
+        io = IoScheduler(tuner.max_jobs if tuner is not None else jobs, io_jobs)
+        to_parse = io.plan(to_parse, stats)
+        if (tuner is not None or jobs > 1) and len(to_parse) > 1:
+            self._run_pool(to_parse, on_result, io, jobs, tuner)
+        else:
+            for apk_path in to_parse:
+                on_result(apk_path, self._parse_one(apk_path, io))
+        
+        if catalog is not None and pending:
+            with tracer.span('emit', 'io', records=len(pending)):
+                catalog.upsert_many(pending, release)
+        
+        return {apk_path: results[apk_path] for apk_path in apk_paths}
+    
+    def _run_pool(
+        self,
+        to_parse: list,
+        on_result,
+        io: Optional[IoScheduler],
+        jobs: int,
+        tuner: Optional[ConcurrencyTuner] = None
+    ):
+        """
+        在线程池中解析，同时在途的任务数有上限，文件再多也不会一次性创建所有任务
+        
+        固定并发时最多提交jobs*2个任务，保证线程空闲时总有下一个任务；
+        指定调节器时按调节器当前的并发上限提交，每完成一个文件记录耗时。
+        """
+        def timed_parse(apk_path):
+            start = time.perf_counter()
+            result = self._parse_one(apk_path, io)
+            return result, time.perf_counter() - start
+        
+        max_workers = tuner.max_jobs if tuner is not None else jobs
+        remaining = iter(to_parse)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                window = tuner.limit if tuner is not None else jobs * 2
+                while len(in_flight) < window:
+                    apk_path = next(remaining, None)
+                    if apk_path is None:
+                        break
+                    in_flight[executor.submit(timed_parse, apk_path)] = apk_path
+                if not in_flight:
+                    break
+                
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result, elapsed = future.result()
+                    on_result(in_flight.pop(future), result)
+                    if tuner is not None:
+                        tuner.record(elapsed)
+    
+    def _parse_one(self, apk_path: str, io: Optional[IoScheduler] = None) -> Dict:
+        """解析单个APK，返回batch_parse格式的结果"""
+        try:
+            channel_info = self.get_channel(apk_path, io)
+            return {
+                'success': True,
+                'data': channel_info
+            }
+        except Exception as e:
+            logger.error(f"解析 {apk_path} 失败: {str(e)}")
+            result = {
+                'success': False,
+                'error': str(e)
+            }
+            if isinstance(e, ApkFormatError):
+                result['error_code'] = e.code
+            return result
@@ -0,0 +1,179 @@
+"""批量解析的自适应并发调节模块"""
+import time
+import statistics
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+
+
+class ConcurrencyTuner:
+    """
+    按实测吞吐自动调节批量解析的并发数（AIMD + 爬山）
+    
+    - 每个观测窗口统计完成数/秒和单个文件耗时的中位数
+    - 吞吐仍在提升时并发数加1；加1后吞吐没有明显提升，说明已到拐点，退回并保持若干窗口后再试探
+    - 吞吐明显下降，或耗时远高于历史最好值且吞吐没有提升时，并发数按比例减小；
+      减小后吞吐随之下降属于正常现象，下一窗口重新加1试探
+    - 并发数始终在[min_jobs, max_jobs]内，每次调整都写入日志
+    
+    record()只应在分发任务的线程中调用。
+    """
+    
+    def __init__(
+        self,
+        initial: int = 4,
+        min_jobs: int = 1,
+        max_jobs: int = 16,
+        window_items: int = 20,
+        window_seconds: float = 1.0,
+        gain: float = 0.05,
+        drop: float = 0.15,
+        backoff: float = 0.7,
+        latency_factor: float = 3.0,
+        hold_windows: int = 5
+    ):
+        """
+        Args:
+            initial: 初始并发数
+            min_jobs: 并发数下限
+            max_jobs: 并发数上限
+            window_items: 每个观测窗口至少完成的文件数
+            window_seconds: 每个观测窗口至少持续的秒数
+            gain: 吞吐提升比例低于该值时视为没有提升
+            drop: 吞吐下降比例超过该值时减小并发
+            backoff: 减小并发时乘以的系数
+            latency_factor: 耗时中位数超过历史最好值的倍数时视为过载
+            hold_windows: 到达拐点后保持的窗口数
+        """
+        if min_jobs < 1 or max_jobs < min_jobs:
+            raise Exception(f"并发范围无效: {min_jobs}~{max_jobs}")
+        self.min_jobs = min_jobs
+        self.max_jobs = max_jobs
+        self.limit = min(max(initial, min_jobs), max_jobs)
+        self.window_items = window_items
+        self.window_seconds = window_seconds
+        self.gain = gain
+        self.drop = drop
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.hold_windows = hold_windows
+        self.decisions: List[Dict[str, Any]] = []
+        
+        self._window_start = time.monotonic()
+        self._latencies: List[float] = []
+        self._previous: Optional[Dict[str, float]] = None
+        self._best_latency: Optional[float] = None
+        self._hold = 0
+    
+    @staticmethod
+    def from_config(config: Dict, initial: int, min_jobs: Optional[int] = None, max_jobs: Optional[int] = None) -> 'ConcurrencyTuner':
+        """
+        根据配置创建调节器
+        
+        配置格式：
+            "concurrency_tuning": {
+                "min_jobs": 1,
+                "max_jobs": 16,
+                "window_items": 20,
+                "window_seconds": 1.0
+            }
+        
+        Args:
+            initial: 初始并发数
+            min_jobs: 指定时覆盖配置中的下限
+            max_jobs: 指定时覆盖配置中的上限
+        """
+        options = dict(config.get('concurrency_tuning') or {})
+        if min_jobs is not None:
+            options['min_jobs'] = min_jobs
+        if max_jobs is not None:
+            options['max_jobs'] = max_jobs
+        min_jobs = int(options.get('min_jobs', 1))
+        max_jobs = max(min_jobs, int(options.get('max_jobs', 16)))
+        
+        tuner = ConcurrencyTuner(
+            initial=initial,
+            min_jobs=min_jobs,
+            max_jobs=max_jobs,
+            window_items=int(options.get('window_items', 20)),
+            window_seconds=float(options.get('window_seconds', 1.0))
+        )
+        logger.info(f"已启用自适应并发，范围 {tuner.min_jobs}~{tuner.max_jobs}，初始 {tuner.limit}")
+        return tuner
+    
+    def record(self, latency: float):
+        """
+        记录一个文件的解析耗时，窗口结束时调整并发数
+        
+        Args:
+            latency: 单个文件的解析耗时（秒）
+        """
+        self._latencies.append(latency)
+        elapsed = time.monotonic() - self._window_start
+        if len(self._latencies) < self.window_items or elapsed < self.window_seconds:
+            return
+        
+        throughput = len(self._latencies) / elapsed
+        latency_ms = statistics.median(self._latencies) * 1000
+        self._adjust(throughput, latency_ms)
+        self._latencies = []
+        self._window_start = time.monotonic()
+    
+    def _adjust(self, throughput: float, latency_ms: float):
+        """根据本窗口的吞吐和耗时决定下一窗口的并发数"""
+        old = self.limit
+        previous = self._previous
+        if self._best_latency is None or latency_ms < self._best_latency:
+            self._best_latency = latency_ms
+        
+        if previous is None:
+            new, reason = old + 1, '首个窗口，开始试探'
+        elif old >= previous['limit'] and throughput < previous['throughput'] * (1 - self.drop):
+            new, reason = int(old * self.backoff), '吞吐下降'
+        elif old > previous['limit'] and throughput < previous['throughput'] * (1 + self.gain):
+            new, reason = int(previous['limit']), '增加并发后吞吐无明显提升，已到拐点'
+            self._hold = self.hold_windows
+        elif (old >= previous['limit'] and latency_ms > self._best_latency * self.latency_factor
+                and throughput < previous['throughput'] * (1 + self.gain)):
+            new, reason = int(old * self.backoff), '耗时上升且吞吐无提升'
+        elif self._hold > 0:
+            self._hold -= 1
+            new, reason = old, '保持在拐点'
+        elif throughput >= previous['throughput'] * (1 + self.gain):
+            new, reason = old + 1, '吞吐提升，继续试探'
+        else:
+            new, reason = old + 1, '吞吐持平，重新试探'
+        
+        new = min(max(new, self.min_jobs), self.max_jobs)
+        self.limit = new
+        self._previous = {'limit': old, 'throughput': throughput, 'latency_ms': latency_ms}
+        self.decisions.append({
+            'time': round(time.time(), 3),
+            'from': old,
+            'to': new,
+            'throughput': round(throughput, 2),
+            'latency_ms': round(latency_ms, 2),
+            'reason': reason,
+        })
+        
+        message = (f"并发 {old} -> {new}（吞吐 {throughput:.1f}个/秒，"
+                   f"耗时中位数 {latency_ms:.1f}ms）: {reason}")
+        if new != old:
+            logger.info(message)
+        else:
+            logger.debug(message)
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        调节统计
+        
+        Returns:
+            包含最终并发数、窗口数、调整次数和吞吐最高时的并发数的字典
+        """
+        best = max(self.decisions, key=lambda d: d['throughput'], default=None)
+        return {
+            'limit': self.limit,
+            'windows': len(self.decisions),
+            'changes': sum(1 for d in self.decisions if d['from'] != d['to']),
+            'best_limit': best['from'] if best else None,
+            'best_throughput': best['throughput'] if best else None,
+        }
@@ -0,0 +1,139 @@
+"""批量解析的I/O调度模块"""
+import os
+import sys
+import threading
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+from utils.logger import logger
+
+
+# 网络文件系统类型（/proc/self/mountinfo中的fstype）
+NETWORK_FS_TYPES = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'afs', 'ceph', 'lustre',
+    'glusterfs', 'fuse.glusterfs', 'fuse.sshfs', 'fuse.s3fs', 'fuse.rclone',
+}
+
+
+class IoScheduler:
+    """
+    按设备分组调度批量解析的文件读取
+    
+    - 按st_dev分组，每个设备单独限制同时读取的文件数，与解析线程数无关
+    - 网络文件系统和机械硬盘使用较低的并发上限，本地SSD不限制
+    - 同一设备内按inode排序，设备之间轮流交错，使各设备同时有任务且读取位置尽量连续
+    """
+    
+    # 各类设备的默认并发读取上限
+    NETWORK_IO_LIMIT = 2
+    ROTATIONAL_IO_LIMIT = 1
+    
+    def __init__(self, jobs: int, per_device: Optional[int] = None):
+        """
+        Args:
+            jobs: 解析线程数
+            per_device: 每个设备的并发读取上限，为None时按设备类型自动选择
+        """
+        self.jobs = jobs
+        self.per_device = per_device
+        self._devices: Dict[str, int] = {}
+        self._slots: Dict[int, threading.BoundedSemaphore] = {}
+        self._mount_types: Optional[Dict[int, str]] = None
+    
+    def plan(self, apk_paths: List[str], stats: Dict[str, Optional[os.stat_result]]) -> List[str]:
+        """
+        生成读取顺序，并为每个设备创建并发限制
+        
+        Args:
+            apk_paths: 待解析的文件
+            stats: {路径: stat结果}，stat失败的文件为None，排在最后
+        
+        Returns:
+            排序后的路径列表
+        """
+        groups: Dict[int, List] = {}
+        unknown = []
+        for apk_path in apk_paths:
+            st = stats.get(apk_path)
+            if st is None:
+                unknown.append(apk_path)
+                continue
+            groups.setdefault(st.st_dev, []).append((st.st_ino, apk_path))
+            self._devices[apk_path] = st.st_dev
+        
+        for dev, items in groups.items():
+            items.sort()
+            limit = self.device_limit(dev)
+            if limit < self.jobs:
+                self._slots[dev] = threading.BoundedSemaphore(limit)
+            logger.debug(f"设备 {dev}: {len(items)} 个文件，并发读取上限 {min(limit, self.jobs)}")
+        
+        ordered = []
+        queues = [items for _, items in sorted(groups.items())]
+        for i in range(max((len(items) for items in queues), default=0)):
+            for items in queues:
+                if i < len(items):
+                    ordered.append(items[i][1])
+        return ordered + unknown
+    
+    def slot(self, apk_path: str):
+        """读取文件前获取所在设备的并发名额（with语句使用）"""
+        dev = self._devices.get(apk_path)
+        semaphore = self._slots.get(dev) if dev is not None else None
+        return semaphore if semaphore is not None else nullcontext()
+    
+    def device_limit(self, dev: int) -> int:
+        """设备的并发读取上限"""
+        if self.per_device:
+            return self.per_device
+        kind = self.device_kind(dev)
+        if kind == 'network':
+            return self.NETWORK_IO_LIMIT
+        if kind == 'rotational':
+            return self.ROTATIONAL_IO_LIMIT
+        return self.jobs
+    
+    def device_kind(self, dev: int) -> str:
+        """
+        判断设备类型（仅Linux可识别，其他平台均视为local）
+        
+        Returns:
+            'network'、'rotational' 或 'local'
+        """
+        if not sys.platform.startswith('linux'):
+            return 'local'
+        if self._mount_types is None:
+            self._mount_types = self._read_mount_types()
+        if self._mount_types.get(dev) in NETWORK_FS_TYPES:
+            return 'network'
+        if self._is_rotational(dev):
+            return 'rotational'
+        return 'local'
+    
+    @staticmethod
+    def _read_mount_types() -> Dict[int, str]:
+        """{st_dev: 文件系统类型}"""
+        mount_types = {}
+        try:
+            with open('/proc/self/mountinfo', 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    fields = line.split()
+                    if '-' not in fields:
+                        continue
+                    major, minor = fields[2].split(':')
+                    fstype = fields[fields.index('-') + 1]
+                    mount_types[os.makedev(int(major), int(minor))] = fstype
+        except (OSError, ValueError):
+            pass
+        return mount_types
+    
+    @staticmethod
+    def _is_rotational(dev: int) -> bool:
+        """块设备是否为机械硬盘，分区读取其所属磁盘的属性"""
+        device_dir = os.path.realpath(f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}')
+        for path in (device_dir, os.path.dirname(device_dir)):
+            try:
+                with open(os.path.join(path, 'queue', 'rotational'), 'r') as f:
+                    return f.read().strip() == '1'
+            except OSError:
+                continue
+        return False
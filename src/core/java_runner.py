@@ -1,27 +1,61 @@
 """Java运行时管理模块"""
 import os
+import re
 import subprocess
 import platform
+import threading
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 from utils.logger import logger
 from utils.file_helper import FileHelper
+from utils import tracer
+from core.process_scheduler import get_scheduler
 
 
 class JavaRunner:
     """Java运行时管理器"""
     
-    def __init__(self):
-        """初始化Java运行时"""
+    # 启动优化参数及其要求的最低Java主版本号（仅HotSpot）
+    STARTUP_FLAGS = [
+        ('-Xshare:auto', 6),
+        ('-XX:TieredStopAtLevel=1', 8),
+        ('-XX:+UseSerialGC', 6),
+        ('-XX:-UsePerfData', 6),
+        ('-Xss512k', 6),
+        ('-Xms16m', 6),
+        ('-Xmx256m', 6),
+    ]
+    
+    # AppCDS动态归档（由build.py --cds生成）
+    # 归档中记录的是相对jar路径，JDK 13起支持相对路径匹配，运行时需在jar所在目录启动
+    CDS_ARCHIVE = 'resources/VasDolly.jsa'
+    CDS_MIN_VERSION = 13
+    # 生成归档的JVM信息，归档只能被同一个JVM构建使用，否则JVM每次启动都会告警并忽略归档
+    CDS_INFO = 'resources/VasDolly.jsa.json'
+    
+    def __init__(self, tuned: bool = True):
+        """
+        初始化Java运行时
+        
+        Args:
+            tuned: 是否使用启动优化参数
+        """
         self.java_path = None
         self.vasdolly_jar = None
+        self.java_version = None
+        self.jvm_flags: List[str] = []
+        self.jar_cwd = None
         self.system = platform.system()
         
         try:
-            self.java_path = self._find_java()
-            self.vasdolly_jar = self._find_vasdolly_jar()
+            with tracer.span('java_discovery', 'java'):
+                self.java_path = self._find_java()
+                self.vasdolly_jar = self._find_vasdolly_jar()
+                if tuned:
+                    self.jvm_flags = self._get_startup_flags()
             logger.info(f"Java路径: {self.java_path}")
             logger.info(f"VasDolly路径: {self.vasdolly_jar}")
+            logger.info(f"JVM参数: {' '.join(self.jvm_flags) or '默认'}")
         except Exception as e:
             logger.error(f"初始化失败: {str(e)}")
             raise
@@ -95,6 +129,86 @@ class JavaRunner:
             "或将jar文件放在程序同目录下"
         )
     
+    def _get_startup_flags(self) -> List[str]:
+        """
+        根据检测到的Java版本选择启动优化参数
+        
+        非HotSpot虚拟机（如OpenJ9）或版本无法识别时不加任何参数。
+        """
+        version_output = self._get_version_output()
+        self.java_version = self.parse_major_version(version_output)
+        if self.java_version is None:
+            logger.warning("无法识别Java版本，使用默认JVM参数")
+            return []
+        if 'J9' in version_output:
+            logger.info("检测到非HotSpot虚拟机，使用默认JVM参数")
+            return []
+        
+        flags = self.select_startup_flags(self.java_version)
+        
+        archive = FileHelper.get_resource_path(self.CDS_ARCHIVE)
+        if (self.java_version >= self.CDS_MIN_VERSION and os.path.exists(archive)
+                and self._matches_cds_jvm(version_output)):
+            jar_dir = os.path.dirname(os.path.abspath(self.vasdolly_jar))
+            if os.path.dirname(os.path.abspath(archive)) == jar_dir:
+                flags.append(f'-XX:SharedArchiveFile={os.path.basename(archive)}')
+                self.jar_cwd = jar_dir
+                logger.info(f"使用AppCDS归档: {archive}")
+        
+        return flags
+    
+    @classmethod
+    def select_startup_flags(cls, java_version: int) -> List[str]:
+        """指定Java主版本可用的启动优化参数（不含AppCDS归档），build.py生成归档时使用同一组参数"""
+        return [flag for flag, min_version in cls.STARTUP_FLAGS if java_version >= min_version]
+    
+    def _matches_cds_jvm(self, version_output: str) -> bool:
+        """当前Java是否为生成AppCDS归档的JVM（按java -version输出比较）"""
+        info = FileHelper.read_json(FileHelper.get_resource_path(self.CDS_INFO))
+        built_with = info.get('version_output')
+        if not built_with:
+            logger.info("AppCDS归档缺少生成信息，不使用归档")
+            return False
+        if self._normalize_version(built_with) != self._normalize_version(version_output):
+            logger.info(f"当前Java与生成AppCDS归档的Java（{info.get('java')}）不是同一构建，不使用归档")
+            return False
+        return True
+    
+    @staticmethod
+    def _normalize_version(version_output: str) -> str:
+        """去掉是否启用类数据共享等与JVM构建无关的差异"""
+        lines = [line.strip().replace(', sharing', '') for line in version_output.splitlines()]
+        return '\n'.join(line for line in lines if line and not line.startswith('Picked up'))
+    
+    def _get_version_output(self) -> str:
+        """获取java -version的完整输出"""
+        try:
+            result = subprocess.run(
+                [self.java_path, '-version'],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            return result.stderr if result.stderr else result.stdout
+        except Exception as e:
+            logger.warning(f"获取Java版本失败: {str(e)}")
+            return ""
+    
+    @staticmethod
+    def parse_major_version(version_output: str) -> Optional[int]:
+        """
+        从java -version输出中解析主版本号
+        
+        示例: 'java version "1.8.0_292"' -> 8, 'openjdk version "17.0.9"' -> 17
+        """
+        match = re.search(r'version "(\d+)(?:\.(\d+))?', version_output or "")
+        if not match:
+            return None
+        major = int(match.group(1))
+        if major == 1 and match.group(2):
+            major = int(match.group(2))
+        return major
+    
     def check_environment(self) -> Tuple[bool, str]:
         """
         检查运行环境
@@ -123,13 +237,26 @@ class JavaRunner:
         except Exception as e:
             return False, f"环境检查失败: {str(e)}"
     
-    def run_command(self, args: list, timeout: int = 60) -> Tuple[str, str, int]:
+    def run_command(
+        self,
+        args: list,
+        timeout: Optional[float] = None,
+        size_hint: int = 0,
+        cancel_event: Optional[threading.Event] = None,
+        apk_path: Optional[str] = None
+    ) -> Tuple[str, str, int]:
         """
         执行VasDolly命令
         
+        命令统一交给全局调度器执行，受并发数和内存预算限制，
+        超时或取消时会结束整个进程树。
+        
         Args:
             args: 命令参数列表
-            timeout: 超时时间（秒）
+            timeout: 超时时间（秒），为None时根据历史耗时自动计算
+            size_hint: APK文件大小（字节），用于自适应超时
+            cancel_event: 取消事件
+            apk_path: APK文件路径，追加到参数末尾；在jar目录下启动时转为绝对路径
             
         Returns:
             (stdout, stderr, returncode)
@@ -137,35 +264,65 @@ class JavaRunner:
         if not self.java_path or not self.vasdolly_jar:
             raise Exception("Java环境未正确初始化")
         
-        cmd = [self.java_path, '-jar', self.vasdolly_jar] + args
+        if apk_path is not None:
+            # 使用CDS归档时在jar目录下以相对路径启动，APK路径需转为绝对路径
+            args = list(args) + [os.path.abspath(apk_path) if self.jar_cwd else apk_path]
+        if self.jar_cwd:
+            jar = os.path.basename(self.vasdolly_jar)
+        else:
+            jar = self.vasdolly_jar
+        
+        cmd = [self.java_path] + self.jvm_flags + ['-jar', jar] + args
         logger.info(f"执行命令: {' '.join(cmd)}")
         
-        try:
-            result = subprocess.run(
+        with tracer.span('run_command', 'java', command=args[0] if args else '') as command_span:
+            stdout, stderr, code = get_scheduler().run(
                 cmd,
-                capture_output=True,
-                text=True,
+                size_hint=size_hint,
                 timeout=timeout,
-                encoding='utf-8',
-                errors='ignore'
+                cancel_event=cancel_event,
+                cwd=self.jar_cwd
             )
+            command_span.set(code=code)
+        
+        logger.debug(f"命令返回码: {code}")
+        if stdout:
+            logger.debug(f"标准输出: {stdout}")
+        if stderr:
+            logger.debug(f"标准错误: {stderr}")
+        
+        return stdout, stderr, code
+    
+    def warm_up(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        """
+        预热Java运行时
+        
+        读取一遍VasDolly.jar，并以相同的JVM参数执行一次 -version，
+        使jar、JVM库和CDS归档进入页缓存，之后的首次解析启动更快。
+        
+        Args:
+            cancel_event: 取消事件，置位后停止读取并结束预热进程
+        
+        Returns:
+            是否完成预热
+        """
+        if not self.java_path or not self.vasdolly_jar:
+            return False
+        
+        with tracer.span('warm_up', 'java') as warm_span:
+            with open(self.vasdolly_jar, 'rb') as f:
+                while f.read(1024 * 1024):
+                    if cancel_event is not None and cancel_event.is_set():
+                        warm_span.set(cancelled=True)
+                        return False
             
-            logger.debug(f"命令返回码: {result.returncode}")
-            if result.stdout:
-                logger.debug(f"标准输出: {result.stdout}")
-            if result.stderr:
-                logger.debug(f"标准错误: {result.stderr}")
-            
-            return result.stdout, result.stderr, result.returncode
-            
-        except subprocess.TimeoutExpired:
-            error_msg = f"命令执行超时（{timeout}秒）"
-            logger.error(error_msg)
-            return "", error_msg, -1
-        except Exception as e:
-            error_msg = f"命令执行失败: {str(e)}"
-            logger.error(error_msg)
-            return "", error_msg, -1
+            cmd = [self.java_path] + self.jvm_flags + ['-version']
+            _, _, code = get_scheduler().run(cmd, timeout=10, cancel_event=cancel_event, cwd=self.jar_cwd)
+            warm_span.set(code=code)
+        
+        if code == 0:
+            logger.debug("Java预热完成")
+        return code == 0
     
     def get_java_version(self) -> Optional[str]:
         """获取Java版本信息"""
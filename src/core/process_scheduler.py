@@ -0,0 +1,338 @@
+"""子进程调度模块"""
+import os
+import math
+import time
+import signal
+import threading
+import subprocess
+from typing import Dict, List, Optional, Tuple
+from utils.logger import logger
+from utils import tracer
+
+
+class ProcessScheduler:
+    """
+    全局子进程调度器
+    
+    所有Java调用统一经过此调度器：
+    - 子进程在独立进程组中启动，超时或取消时结束整个进程树
+    - 按APK大小分桶统计耗时，自适应计算超时时间
+    - 全局并发数与内存预算准入控制，高负载时自动降级
+    """
+    
+    # 自适应超时的平滑系数（与TCP RTO估算相同）
+    _ALPHA = 0.125
+    _BETA = 0.25
+    
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        memory_budget_mb: Optional[int] = None,
+        process_memory_mb: int = 256,
+        default_timeout: float = 60,
+        min_timeout: float = 10,
+        max_timeout: float = 300
+    ):
+        """
+        初始化调度器
+        
+        Args:
+            max_concurrency: 最大并发子进程数，默认取CPU核数的一半
+            memory_budget_mb: 子进程内存预算（MB），默认取当前可用内存的一半
+            process_memory_mb: 单个子进程预估内存占用（MB）
+            default_timeout: 无历史数据时的超时时间（秒）
+            min_timeout: 自适应超时下限（秒）
+            max_timeout: 自适应超时上限（秒）
+        """
+        cpu_count = os.cpu_count() or 2
+        self.max_concurrency = max_concurrency or max(1, cpu_count // 2)
+        self.process_memory_mb = process_memory_mb
+        if memory_budget_mb is None:
+            available = self._available_memory_mb()
+            memory_budget_mb = available // 2 if available else None
+        self.memory_budget_mb = memory_budget_mb
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        
+        self._cond = threading.Condition()
+        self._running = 0
+        self._procs = set()
+        self._latency: Dict[int, Tuple[float, float]] = {}
+        
+        logger.debug(
+            f"调度器初始化: 并发上限={self.max_concurrency}, "
+            f"内存预算={self.memory_budget_mb}MB"
+        )
+    
+    def run(
+        self,
+        cmd: List[str],
+        size_hint: int = 0,
+        timeout: Optional[float] = None,
+        cancel_event: Optional[threading.Event] = None,
+        cwd: Optional[str] = None
+    ) -> Tuple[str, str, int]:
+        """
+        在准入控制下执行子进程并等待结果
+        
+        Args:
+            cmd: 命令及参数列表
+            size_hint: 输入文件大小（字节），用于自适应超时
+            timeout: 超时时间（秒），为None时按历史耗时自动计算
+            cancel_event: 取消事件，置位后立即结束子进程树
+            cwd: 子进程工作目录
+        
+        Returns:
+            (stdout, stderr, returncode)
+        """
+        if timeout is None:
+            timeout = self.get_timeout(size_hint)
+        
+        with tracer.span('admit', 'java'):
+            admitted = self._admit(cancel_event)
+        if not admitted:
+            return "", "命令已取消", -1
+        
+        proc = None
+        try:
+            start = time.monotonic()
+            with tracer.span('spawn', 'java'):
+                proc = self._spawn(cmd, cwd)
+            with self._cond:
+                self._procs.add(proc)
+            
+            with tracer.span('wait', 'java', pid=proc.pid) as wait_span:
+                stdout, stderr, status = self._wait(proc, start + timeout, cancel_event)
+                wait_span.set(status=status, code=proc.returncode)
+            if status == 'timeout':
+                error_msg = f"命令执行超时（{timeout:.0f}秒）"
+                logger.error(error_msg)
+                return stdout, error_msg, -1
+            if status == 'cancelled':
+                logger.warning("命令已取消")
+                return stdout, "命令已取消", -1
+            
+            self._record_latency(size_hint, time.monotonic() - start)
+            return stdout, stderr, proc.returncode
+        
+        except Exception as e:
+            error_msg = f"命令执行失败: {str(e)}"
+            logger.error(error_msg)
+            return "", error_msg, -1
+        finally:
+            with self._cond:
+                if proc is not None:
+                    self._procs.discard(proc)
+                self._running -= 1
+                self._cond.notify_all()
+    
+    def get_timeout(self, size_hint: int) -> float:
+        """
+        根据同大小区间的历史耗时计算超时时间
+        
+        超时 = 2 × (平滑耗时 + 4 × 耗时偏差)，并限制在[min_timeout, max_timeout]内
+        """
+        with self._cond:
+            stats = self._latency.get(self._bucket(size_hint))
+        if stats is None:
+            return self.default_timeout
+        srtt, rttvar = stats
+        timeout = 2 * (srtt + 4 * rttvar)
+        return min(self.max_timeout, max(self.min_timeout, timeout))
+    
+    def _admit(self, cancel_event: Optional[threading.Event]) -> bool:
+        """等待并发与内存准入，返回False表示等待期间被取消"""
+        with self._cond:
+            while not self._has_capacity():
+                if cancel_event is not None and cancel_event.is_set():
+                    return False
+                # 定时复查，系统负载和可用内存可能在等待期间变化
+                self._cond.wait(0.5)
+            self._running += 1
+            return True
+    
+    def _has_capacity(self) -> bool:
+        """判断当前是否还能启动一个子进程（需持有锁）"""
+        if self._running == 0:
+            # 至少允许一个子进程运行，保证任务可以推进
+            return True
+        if self._running >= self._effective_limit():
+            return False
+        if self.memory_budget_mb is not None:
+            reserved = (self._running + 1) * self.process_memory_mb
+            if reserved > self.memory_budget_mb:
+                return False
+        return True
+    
+    def _effective_limit(self) -> int:
+        """根据系统负载和可用内存计算实际并发上限"""
+        limit = self.max_concurrency
+        
+        # 机器过载时减半，避免与构建任务争抢CPU
+        if hasattr(os, 'getloadavg'):
+            try:
+                load = os.getloadavg()[0]
+                if load > (os.cpu_count() or 1) * 1.5:
+                    limit = max(1, limit // 2)
+            except OSError:
+                pass
+        
+        # 可用内存不足时只保留一个子进程
+        available = self._available_memory_mb()
+        if available is not None and available < self.process_memory_mb * 2:
+            limit = 1
+        
+        return limit
+    
+    def _spawn(self, cmd: List[str], cwd: Optional[str] = None) -> subprocess.Popen:
+        """在独立进程组中启动子进程"""
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        
+        return subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='ignore',
+            **kwargs
+        )
+    
+    def _wait(
+        self,
+        proc: subprocess.Popen,
+        deadline: float,
+        cancel_event: Optional[threading.Event]
+    ) -> Tuple[str, str, str]:
+        """
+        分片等待子进程结束，期间检查超时与取消
+        
+        Returns:
+            (stdout, stderr, 状态)，状态为 'done'、'timeout' 或 'cancelled'
+        """
+        status = 'done'
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                status = 'cancelled'
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                status = 'timeout'
+                break
+            try:
+                stdout, stderr = proc.communicate(timeout=min(remaining, 0.2))
+                return stdout or "", stderr or "", status
+            except subprocess.TimeoutExpired:
+                continue
+        
+        self._kill_tree(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=5)
+        except (subprocess.TimeoutExpired, ValueError):
+            stdout, stderr = "", ""
+        return stdout or "", stderr or "", status
+    
+    def _kill_tree(self, proc: subprocess.Popen):
+        """
+        结束子进程及其所有后代进程
+        
+        直接子进程已退出时，后代进程仍可能留在进程组中并占用输出管道，
+        因此不论子进程是否已退出都向整个进程组发送信号。
+        """
+        try:
+            if os.name == 'nt':
+                subprocess.run(
+                    ['taskkill', '/F', '/T', '/PID', str(proc.pid)],
+                    capture_output=True,
+                    timeout=10
+                )
+            else:
+                os.killpg(proc.pid, signal.SIGTERM)
+                try:
+                    proc.wait(timeout=1)
+                except subprocess.TimeoutExpired:
+                    pass
+                # 忽略SIGTERM或尚未退出的后代进程
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        except Exception as e:
+            logger.warning(f"结束进程树失败: {str(e)}")
+            proc.kill()
+    
+    def _record_latency(self, size_hint: int, elapsed: float):
+        """更新所属大小区间的平滑耗时和耗时偏差"""
+        bucket = self._bucket(size_hint)
+        with self._cond:
+            stats = self._latency.get(bucket)
+            if stats is None:
+                self._latency[bucket] = (elapsed, elapsed / 2)
+            else:
+                srtt, rttvar = stats
+                rttvar = (1 - self._BETA) * rttvar + self._BETA * abs(srtt - elapsed)
+                srtt = (1 - self._ALPHA) * srtt + self._ALPHA * elapsed
+                self._latency[bucket] = (srtt, rttvar)
+    
+    @staticmethod
+    def _bucket(size_hint: int) -> int:
+        """按文件大小划分区间：<1MB为0，之后每翻一倍进入下一个区间"""
+        mb = size_hint / (1024 * 1024)
+        if mb < 1:
+            return 0
+        return int(math.log2(mb)) + 1
+    
+    @staticmethod
+    def _available_memory_mb() -> Optional[int]:
+        """获取当前可用物理内存（MB），无法获取时返回None"""
+        try:
+            if os.path.exists('/proc/meminfo'):
+                with open('/proc/meminfo', 'r') as f:
+                    for line in f:
+                        if line.startswith('MemAvailable:'):
+                            return int(line.split()[1]) // 1024
+            if os.name == 'nt':
+                import ctypes
+                
+                class MEMORYSTATUSEX(ctypes.Structure):
+                    _fields_ = [
+                        ('dwLength', ctypes.c_ulong),
+                        ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong),
+                        ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong),
+                        ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong),
+                        ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('sullAvailExtendedVirtual', ctypes.c_ulonglong),
+                    ]
+                
+                status = MEMORYSTATUSEX()
+                status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+                ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+                return status.ullAvailPhys // (1024 * 1024)
+            if hasattr(os, 'sysconf') and 'SC_AVPHYS_PAGES' in os.sysconf_names:
+                pages = os.sysconf('SC_AVPHYS_PAGES')
+                return pages * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+        except Exception:
+            pass
+        return None
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ProcessScheduler:
+    """获取全局调度器实例（所有GUI线程和批量任务共享）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ProcessScheduler()
+        return _scheduler
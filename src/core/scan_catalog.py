@@ -0,0 +1,230 @@
+"""APK扫描结果目录模块"""
+import csv
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from core.scan_record import RECORD_FIELDS
+from utils.logger import logger
+
+
+class ScanCatalog:
+    """
+    基于SQLite的APK扫描结果目录
+    
+    以文件路径为主键保存每次扫描的结果，重复扫描时增量更新；
+    渠道、版本、指纹字段均建有索引，十万级记录的查询在毫秒级完成。
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS apks (
+            path TEXT PRIMARY KEY,
+            release TEXT,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            fingerprint TEXT,
+            channel TEXT,
+            schemes TEXT,
+            success INTEGER NOT NULL,
+            error TEXT,
+            scan_time REAL NOT NULL,
+            info TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_apks_channel ON apks(channel, release);
+        CREATE INDEX IF NOT EXISTS idx_apks_release ON apks(release, channel);
+        CREATE INDEX IF NOT EXISTS idx_apks_fingerprint ON apks(fingerprint);
+    """
+    
+    UPSERT = """
+        INSERT INTO apks (path, release, size, mtime_ns, fingerprint, channel,
+                          schemes, success, error, scan_time, info)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            release = COALESCE(excluded.release, apks.release),
+            size = excluded.size,
+            mtime_ns = excluded.mtime_ns,
+            fingerprint = excluded.fingerprint,
+            channel = excluded.channel,
+            schemes = excluded.schemes,
+            success = excluded.success,
+            error = excluded.error,
+            scan_time = excluded.scan_time,
+            info = excluded.info
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        打开（或创建）扫描目录
+        
+        Args:
+            db_path: SQLite数据库文件路径
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(self.SCHEMA)
+        logger.debug(f"打开扫描目录: {db_path}")
+    
+    def lookup(self, path: str) -> Optional[Dict[str, Any]]:
+        """按路径查询单条记录"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM apks WHERE path = ?', (path,)).fetchone()
+        return self._row_to_record(row) if row else None
+    
+    def lookup_many(self, paths: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量按路径查询记录，返回 {path: record}"""
+        records = {}
+        # SQLite默认最多999个绑定参数，分批查询
+        for i in range(0, len(paths), 500):
+            chunk = paths[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT * FROM apks WHERE path IN ({placeholders})', chunk
+                ).fetchall()
+            for row in rows:
+                records[row['path']] = self._row_to_record(row)
+        return records
+    
+    def upsert_many(self, records: Iterable[Dict[str, Any]], release: Optional[str] = None) -> int:
+        """
+        在单个事务中批量写入或更新记录
+        
+        Args:
+            records: 扫描记录（见core.scan_record.make_record）
+            release: 版本标识，为None时保留已有值
+        
+        Returns:
+            写入的记录数
+        """
+        rows = [
+            (
+                r['path'], release, r['size'], r['mtime_ns'], r.get('fingerprint'),
+                r.get('channel'), ','.join(r.get('schemes') or []), int(bool(r.get('success'))),
+                r.get('error'), r['scan_time'], json.dumps(r.get('info') or {}, ensure_ascii=False),
+            )
+            for r in records
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(self.UPSERT, rows)
+        logger.debug(f"扫描目录写入 {len(rows)} 条记录")
+        return len(rows)
+    
+    def query_channel(self, channel: str, release: Optional[str] = None) -> List[Dict[str, Any]]:
+        """查询指定渠道的所有APK"""
+        sql = 'SELECT * FROM apks WHERE channel = ?'
+        params = [channel]
+        if release is not None:
+            sql += ' AND release = ?'
+            params.append(release)
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY path', params).fetchall()
+        return [self._row_to_record(row) for row in rows]
+    
+    def missing_channels(self, base_release: str, target_release: str) -> List[str]:
+        """查询在base_release中存在、但在target_release中缺失的渠道"""
+        sql = """
+            SELECT DISTINCT channel FROM apks
+            WHERE release = ? AND channel IS NOT NULL
+              AND channel NOT IN (
+                  SELECT channel FROM apks WHERE release = ? AND channel IS NOT NULL
+              )
+            ORDER BY channel
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, (base_release, target_release)).fetchall()
+        return [row['channel'] for row in rows]
+    
+    def duplicates(self, by: str = 'fingerprint', release: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        查询重复项
+        
+        Args:
+            by: 'fingerprint' 查找内容相同的文件，'channel' 查找同一渠道对应多个文件
+            release: 只在指定版本内查找
+        
+        Returns:
+            {指纹或渠道: [路径列表]}
+        """
+        if by not in ('fingerprint', 'channel'):
+            raise Exception(f"不支持的重复项类型: {by}")
+        
+        where = f'{by} IS NOT NULL'
+        params = []
+        if release is not None:
+            where += ' AND release = ?'
+            params.append(release)
+        sql = f"""
+            SELECT {by} AS key, path FROM apks
+            WHERE {where} AND {by} IN (
+                SELECT {by} FROM apks WHERE {where} GROUP BY {by} HAVING COUNT(*) > 1
+            )
+            ORDER BY {by}, path
+        """
+        groups: Dict[str, List[str]] = {}
+        with self._lock:
+            for row in self._conn.execute(sql, params + params):
+                groups.setdefault(row['key'], []).append(row['path'])
+        return groups
+    
+    def export(self, output_path: str, fmt: str = 'jsonl', release: Optional[str] = None) -> int:
+        """
+        导出记录为CSV或JSONL文件（逐行写出，不在内存中保留全部记录）
+        
+        Returns:
+            导出的记录数
+        """
+        if fmt not in ('csv', 'jsonl'):
+            raise Exception(f"不支持的导出格式: {fmt}")
+        
+        sql = 'SELECT * FROM apks'
+        params = []
+        if release is not None:
+            sql += ' WHERE release = ?'
+            params.append(release)
+        
+        fields = ['release'] + RECORD_FIELDS
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with self._lock, open(output_path, 'w', encoding='utf-8', newline='') as f:
+            writer = None
+            if fmt == 'csv':
+                writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+                writer.writeheader()
+            for row in self._conn.execute(sql + ' ORDER BY path', params):
+                record = self._row_to_record(row)
+                if writer:
+                    record['schemes'] = ','.join(record['schemes'])
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+        
+        logger.info(f"导出 {count} 条记录到 {output_path}")
+        return count
+    
+    def count(self) -> int:
+        """记录总数"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM apks').fetchone()[0]
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    @staticmethod
+    def _row_to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        """数据库行转换为扫描记录字典"""
+        record = dict(row)
+        record['schemes'] = [s for s in (record.get('schemes') or '').split(',') if s]
+        record['success'] = bool(record['success'])
+        record['info'] = json.loads(record['info']) if record.get('info') else {}
+        return record
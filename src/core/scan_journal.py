@@ -0,0 +1,143 @@
+"""批量扫描检查点日志模块"""
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+
+
+class ScanJournal:
+    """
+    只追加的扫描结果日志（JSONL），同时作为 scan --output 的流式输出
+    
+    - 每完成一个文件立即追加一行并flush，fsync按条数或时间间隔批量执行
+    - 恢复时读取已有记录，最后一行写了一半（进程被杀、断电）时截掉该行
+    - 扫描结束后按输入顺序重写为每个文件一条记录，恢复运行与一次跑完的最终输出一致
+    """
+    
+    def __init__(self, path: str, resume: bool = False, fsync_every: int = 200, fsync_interval: float = 1.0):
+        """
+        Args:
+            path: 日志文件路径
+            resume: 是否读取已有记录继续扫描，为False时清空已有文件
+            fsync_every: 每追加多少条记录执行一次fsync
+            fsync_interval: 距上次fsync超过该秒数时执行fsync
+        """
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+            self._file = open(path, 'ab')
+        else:
+            self._file = open(path, 'wb')
+    
+    def _load(self):
+        """读取已有记录，截掉末尾不完整的行"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        
+        valid_end = 0
+        pos = 0
+        skipped = 0
+        while pos < len(data):
+            end = data.find(b'\n', pos)
+            if end == -1:
+                break
+            line = data[pos:end].strip()
+            if line:
+                try:
+                    record = json.loads(line)
+                    self.records[record['path']] = record
+                    valid_end = end + 1
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+            else:
+                valid_end = end + 1
+            pos = end + 1
+        
+        if valid_end < len(data):
+            logger.warning(f"检查点日志末尾有 {len(data) - valid_end} 字节不完整数据，已截断")
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+        if skipped:
+            logger.warning(f"检查点日志中有 {skipped} 行无法解析，已忽略")
+        logger.info(f"从检查点日志恢复 {len(self.records)} 条记录: {self.path}")
+    
+    def get(self, apk_path: str) -> Optional[Dict[str, Any]]:
+        """获取文件已记录的结果"""
+        return self.records.get(os.path.abspath(apk_path))
+    
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录"""
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.records[record['path']] = record
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+    
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def finalize(
+        self,
+        apk_paths: List[str],
+        results: Dict[str, Dict[str, Any]],
+        roots: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        按输入顺序重写日志，每个文件保留最新的一条记录
+        
+        Args:
+            apk_paths: 本次扫描的文件列表
+            results: batch_parse的结果，用于补充未能写入日志的文件（如文件已不存在）
+            roots: {文件路径: 扫描输入目录}，写入记录的root字段，供diff计算相对路径
+        
+        Returns:
+            写入的记录数
+        """
+        self.close()
+        tmp_path = f'{self.path}.tmp'
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for apk_path in apk_paths:
+                record = self.get(apk_path)
+                if record is None:
+                    result = results.get(apk_path) or {}
+                    record = {
+                        'path': os.path.abspath(apk_path),
+                        'success': False,
+                        'error': result.get('error') or '解析失败',
+                    }
+                if roots and apk_path in roots:
+                    record = dict(record, root=os.path.abspath(roots[apk_path]))
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return count
+    
+    def close(self):
+        """fsync并关闭日志"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
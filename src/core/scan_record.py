@@ -0,0 +1,69 @@
+"""扫描结果记录模块"""
+import os
+import time
+from typing import Any, Dict, Optional
+from utils.file_helper import FileHelper
+
+
+# 未找到渠道时get_channel返回的占位渠道名
+NO_CHANNEL = '无渠道信息'
+
+# 导出和JSONL文件中记录的字段顺序
+RECORD_FIELDS = [
+    'path', 'size', 'mtime_ns', 'fingerprint', 'channel',
+    'schemes', 'success', 'error', 'scan_time',
+]
+
+
+def make_record(
+    apk_path: str,
+    result: Dict[str, Any],
+    st: Optional[os.stat_result] = None,
+    fingerprint: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    将batch_parse的单项结果转换为可持久化的扫描记录
+    
+    Args:
+        apk_path: APK文件路径
+        result: {'success': bool, 'data': channel_info} 或 {'success': False, 'error': str}
+        st: 文件stat结果，为None时重新获取
+        fingerprint: 文件指纹，为None时重新计算
+    
+    Returns:
+        扫描记录字典
+    """
+    st = st or os.stat(apk_path)
+    data = result.get('data') or {}
+    channel = data.get('channel') if result.get('success') else None
+    if channel == NO_CHANNEL:
+        channel = None
+    
+    schemes = data.get('schemes') or []
+    if isinstance(schemes, str):
+        schemes = [s for s in schemes.split(',') if s]
+    
+    return {
+        'path': os.path.abspath(apk_path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'fingerprint': fingerprint or FileHelper.quick_fingerprint(apk_path),
+        'channel': channel,
+        'schemes': list(schemes),
+        'success': bool(result.get('success')),
+        'error': result.get('error'),
+        'scan_time': time.time(),
+        'info': data,
+    }
+
+
+def is_unchanged(record: Dict[str, Any], st: os.stat_result) -> bool:
+    """判断文件自记录生成后是否未发生变化（大小和修改时间均一致）"""
+    return record.get('size') == st.st_size and record.get('mtime_ns') == st.st_mtime_ns
+
+
+def to_result(record: Dict[str, Any]) -> Dict[str, Any]:
+    """将扫描记录还原为batch_parse的单项结果格式"""
+    if record.get('success'):
+        return {'success': True, 'data': record.get('info') or {'channel': record.get('channel')}}
+    return {'success': False, 'error': record.get('error') or '解析失败'}
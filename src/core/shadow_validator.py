@@ -0,0 +1,268 @@
+"""进程内解析与VasDolly.jar的影子对比验证模块"""
+import os
+import json
+import time
+import queue
+import random
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from core.apk_reader import ApkReader, ApkFormatError, EOCD_SIZE
+from core.channel_decoders import SIGNATURE_SCHEME_IDS, PADDING_ID
+from core.scan_record import NO_CHANNEL
+from utils.logger import logger
+
+
+class ShadowValidator:
+    """
+    影子模式：按采样率在后台线程中用VasDolly.jar重新解析进程内已解析的APK，对比渠道是否一致
+    
+    - 生产结果始终来自进程内解析，Java对比不在关键路径上，后台队列满时直接丢弃样本
+    - 只对比VasDolly.jar能读取的渠道（VasDolly V2/V1），Walle等其他厂商的结果不采样
+    - 不一致时将两侧结果和签名块、ZIP注释的原始字节写入日志，便于复现
+    - 对比样本数达到min_samples后，不一致比例超过阈值时自动切换为VasDolly渠道使用VasDolly.jar
+    """
+    
+    # 记录原始字节时每个值最多保留的字节数
+    RAW_VALUE_LIMIT = 1024
+    
+    # VasDolly.jar能读取的渠道来源（V2签名块中的VasDolly ID和V1注释）
+    COMPARABLE_VENDORS = ('vasdolly', 'vasdolly-v1')
+    
+    def __init__(
+        self,
+        java_get: Callable[[str], Dict[str, str]],
+        sample_rate: float = 0.05,
+        mismatch_threshold: float = 0.01,
+        min_samples: int = 50,
+        log_path: str = 'logs/shadow_mismatch.jsonl',
+        max_pending: int = 32
+    ):
+        """
+        Args:
+            java_get: 通过VasDolly.jar解析渠道的函数，返回get_channel格式的字典
+            sample_rate: 采样率（0~1）
+            mismatch_threshold: 触发回退的不一致比例
+            min_samples: 判断是否回退前至少需要的对比样本数
+            log_path: 不一致记录文件（JSONL）
+            max_pending: 后台队列长度
+        """
+        self.java_get = java_get
+        self.sample_rate = sample_rate
+        self.mismatch_threshold = mismatch_threshold
+        self.min_samples = min_samples
+        self.log_path = log_path
+        self.fallback = False
+        
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {
+            'sampled': 0,
+            'dropped': 0,
+            'compared': 0,
+            'mismatched': 0,
+            'java_errors': 0,
+            'native_seconds': 0.0,
+            'java_seconds': 0.0,
+        }
+    
+    @staticmethod
+    def from_config(java_get: Callable[[str], Dict[str, str]], config: Dict, sample_rate: Optional[float] = None) -> Optional['ShadowValidator']:
+        """
+        根据配置创建验证器，采样率为0时返回None
+        
+        配置格式：
+            "shadow_validation": {
+                "sample_rate": 0.05,
+                "mismatch_threshold": 0.01,
+                "min_samples": 50,
+                "log_path": "logs/shadow_mismatch.jsonl"
+            }
+        
+        Args:
+            sample_rate: 指定时覆盖配置中的采样率
+        """
+        options = dict(config.get('shadow_validation') or {})
+        if sample_rate is not None:
+            options['sample_rate'] = sample_rate
+        if not options.get('sample_rate'):
+            return None
+        
+        validator = ShadowValidator(
+            java_get,
+            sample_rate=min(1.0, float(options['sample_rate'])),
+            mismatch_threshold=float(options.get('mismatch_threshold', 0.01)),
+            min_samples=int(options.get('min_samples', 50)),
+            log_path=options.get('log_path', 'logs/shadow_mismatch.jsonl')
+        )
+        logger.info(f"已启用影子验证，采样率 {validator.sample_rate:.1%}")
+        return validator
+    
+    @classmethod
+    def is_comparable(cls, channel_info: Dict) -> bool:
+        """
+        进程内解析结果能否与VasDolly.jar对比
+        
+        Walle和配置注册的厂商渠道VasDolly.jar读不到，对比必然不一致，不计入一致率。
+        
+        Args:
+            channel_info: get_channel格式的渠道信息
+        """
+        return channel_info.get('vendor') in cls.COMPARABLE_VENDORS
+    
+    def submit(self, apk_path: str, native_channel: Optional[str], native_seconds: float) -> bool:
+        """
+        按采样率提交一次后台对比
+        
+        Args:
+            apk_path: APK文件路径
+            native_channel: 进程内解析得到的渠道
+            native_seconds: 进程内解析耗时（秒）
+        
+        Returns:
+            是否已提交
+        """
+        if self.fallback or random.random() >= self.sample_rate:
+            return False
+        
+        with self._lock:
+            self._stats['sampled'] += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='shadow-validator', daemon=True)
+                self._worker.start()
+        try:
+            self._queue.put_nowait((apk_path, native_channel, native_seconds))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待后台对比全部完成
+        
+        Returns:
+            是否在超时前完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+    
+    def _run(self):
+        while True:
+            apk_path, native_channel, native_seconds = self._queue.get()
+            try:
+                self._compare(apk_path, native_channel, native_seconds)
+            except Exception as e:
+                logger.error(f"影子验证异常 {apk_path}: {str(e)}")
+            finally:
+                self._queue.task_done()
+    
+    def _compare(self, apk_path: str, native_channel: Optional[str], native_seconds: float):
+        """用VasDolly.jar解析并对比"""
+        start = time.perf_counter()
+        try:
+            java_info = self.java_get(apk_path)
+        except Exception as e:
+            with self._lock:
+                self._stats['java_errors'] += 1
+            logger.warning(f"影子验证中VasDolly.jar解析失败 {apk_path}: {str(e)}")
+            return
+        java_seconds = time.perf_counter() - start
+        
+        java_channel = java_info.get('channel')
+        if java_channel == NO_CHANNEL:
+            java_channel = None
+        matched = java_channel == native_channel
+        
+        with self._lock:
+            self._stats['compared'] += 1
+            self._stats['native_seconds'] += native_seconds
+            self._stats['java_seconds'] += java_seconds
+            if not matched:
+                self._stats['mismatched'] += 1
+            compared = self._stats['compared']
+            mismatched = self._stats['mismatched']
+        
+        if matched:
+            return
+        
+        logger.warning(f"影子验证不一致 {apk_path}: 进程内={native_channel}，VasDolly.jar={java_channel}")
+        self._log_mismatch(apk_path, native_channel, java_info)
+        
+        if (not self.fallback and compared >= self.min_samples
+                and mismatched / compared > self.mismatch_threshold):
+            self.fallback = True
+            logger.error(
+                f"影子验证不一致比例 {mismatched}/{compared} 超过阈值 {self.mismatch_threshold:.1%}，"
+                f"已切换为VasDolly.jar解析"
+            )
+    
+    def _log_mismatch(self, apk_path: str, native_channel: Optional[str], java_info: Dict[str, str]):
+        """写入不一致记录，附带签名块ID-值对和ZIP注释的原始字节"""
+        entry = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'path': os.path.abspath(apk_path),
+            'native': native_channel,
+            'java': java_info,
+            'raw': self.capture_raw(apk_path),
+        }
+        directory = os.path.dirname(self.log_path)
+        with self._lock:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    
+    @classmethod
+    def capture_raw(cls, apk_path: str) -> Dict[str, Any]:
+        """
+        读取与渠道相关的原始字节（十六进制）
+        
+        签名方案和填充只记录ID和长度，其余ID-值对记录值的前RAW_VALUE_LIMIT字节。
+        """
+        raw: Dict[str, Any] = {'pairs': []}
+        try:
+            with ApkReader(apk_path) as reader:
+                raw['size'] = reader.size
+                eocd_offset, comment_size = reader.find_eocd()
+                comment = reader.source.read_at(eocd_offset + EOCD_SIZE, comment_size)
+                raw['comment'] = bytes(comment[-cls.RAW_VALUE_LIMIT:]).hex()
+                for pair_id, value in reader.iter_signing_block():
+                    pair = {'id': f'0x{pair_id:08x}', 'length': len(value)}
+                    if pair_id not in SIGNATURE_SCHEME_IDS and pair_id != PADDING_ID:
+                        pair['value'] = bytes(value[:cls.RAW_VALUE_LIMIT]).hex()
+                    raw['pairs'].append(pair)
+        except (ApkFormatError, OSError) as e:
+            raw['error'] = str(e)
+        return raw
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        对比统计
+        
+        Returns:
+            包含样本数、一致率、两种方式的平均耗时及差值（毫秒）、是否已回退的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        compared = stats['compared']
+        native_ms = stats['native_seconds'] * 1000 / compared if compared else 0.0
+        java_ms = stats['java_seconds'] * 1000 / compared if compared else 0.0
+        return {
+            'sampled': stats['sampled'],
+            'dropped': stats['dropped'],
+            'compared': compared,
+            'mismatched': stats['mismatched'],
+            'java_errors': stats['java_errors'],
+            'agreement_rate': (compared - stats['mismatched']) / compared if compared else None,
+            'native_ms': round(native_ms, 3),
+            'java_ms': round(java_ms, 3),
+            'latency_delta_ms': round(java_ms - native_ms, 3),
+            'fallback': self.fallback,
+        }
@@ -0,0 +1,281 @@
+"""基于共享文件系统的分片扫描队列模块"""
+import os
+import json
+import time
+import random
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+from core.scan_record import make_record
+from utils.logger import logger
+
+
+class ShardLease:
+    """工作节点持有的分片租约"""
+    
+    def __init__(self, shard: str, worker_id: str, lease_path: str, paths: List[str]):
+        self.shard = shard
+        self.worker_id = worker_id
+        self.lease_path = lease_path
+        self.paths = paths
+        self.lost = False
+        self.lock = threading.Lock()
+
+
+class ShardQueue:
+    """
+    基于共享目录（如NFS）的分片工作队列，无需消息中间件
+    
+    目录结构：
+        todo/     待处理分片，每个分片是一个APK路径列表（JSON）
+        leases/   已被领取的分片，文件名为 分片名@节点ID@过期时间戳(毫秒)
+        done/     已完成分片
+        results/  每个分片的JSONL结果
+    
+    所有状态转换都通过原子rename完成，同一时刻只有一个节点能成功移动同一个文件；
+    租约过期时间写在文件名中，续约同样通过rename完成，不依赖NFS服务端的mtime。
+    """
+    
+    DIRS = ('todo', 'leases', 'done', 'results')
+    
+    def __init__(self, root: str, lease_ttl: float = 300):
+        """
+        Args:
+            root: 共享队列目录
+            lease_ttl: 租约有效期（秒），节点需在过期前续约
+        """
+        self.root = root
+        self.lease_ttl = lease_ttl
+        for name in self.DIRS:
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+    
+    def _dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+    
+    def publish(self, apk_paths: List[str], shard_size: int = 500) -> int:
+        """
+        将路径列表切分为分片写入todo目录
+        
+        Returns:
+            分片数量
+        """
+        if os.path.exists(os.path.join(self.root, 'manifest.json')):
+            raise Exception(f"队列已初始化: {self.root}")
+        
+        count = 0
+        for i in range(0, len(apk_paths), shard_size):
+            shard = f'shard-{count:06d}.json'
+            self._write_atomic(os.path.join(self._dir('todo'), shard), json.dumps(apk_paths[i:i + shard_size]))
+            count += 1
+        
+        manifest = {'shards': count, 'files': len(apk_paths), 'shard_size': shard_size, 'created': time.time()}
+        self._write_atomic(os.path.join(self.root, 'manifest.json'), json.dumps(manifest))
+        logger.info(f"分片队列初始化: {len(apk_paths)} 个文件，{count} 个分片")
+        return count
+    
+    def claim(self, worker_id: str) -> Optional[ShardLease]:
+        """
+        领取一个分片，没有可领取的分片时返回None
+        
+        会先回收已过期的租约。各节点从随机位置开始尝试，减少同时争抢同一分片。
+        节点ID中的'@'和路径分隔符会被替换为'_'，避免破坏租约文件名。
+        """
+        worker_id = sanitize_worker_id(worker_id)
+        self.reclaim_expired()
+        
+        shards = sorted(os.listdir(self._dir('todo')))
+        if not shards:
+            return None
+        start = random.randrange(len(shards))
+        for shard in shards[start:] + shards[:start]:
+            if not shard.endswith('.json'):
+                continue
+            lease_path = os.path.join(self._dir('leases'), self._lease_name(shard, worker_id))
+            try:
+                os.rename(os.path.join(self._dir('todo'), shard), lease_path)
+            except FileNotFoundError:
+                # 已被其他节点领取
+                continue
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                paths = json.load(f)
+            logger.info(f"领取分片 {shard}（{len(paths)} 个文件）")
+            return ShardLease(shard, worker_id, lease_path, paths)
+        return None
+    
+    def renew(self, lease: ShardLease) -> bool:
+        """续约，返回False表示租约已被回收"""
+        with lease.lock:
+            if lease.lost:
+                return False
+            new_path = os.path.join(self._dir('leases'), self._lease_name(lease.shard, lease.worker_id))
+            try:
+                os.rename(lease.lease_path, new_path)
+                lease.lease_path = new_path
+                return True
+            except FileNotFoundError:
+                lease.lost = True
+                logger.warning(f"分片 {lease.shard} 的租约已被回收")
+                return False
+    
+    def complete(self, lease: ShardLease, records: List[Dict[str, Any]]):
+        """
+        提交分片结果
+        
+        结果文件先写临时文件再rename，即使租约已被回收、分片被重复处理，
+        结果文件也始终是某一次完整处理的输出。
+        """
+        result_path = os.path.join(self._dir('results'), lease.shard.replace('.json', '.jsonl'))
+        content = ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records)
+        self._write_atomic(result_path, content, suffix=f'.{lease.worker_id}')
+        
+        with lease.lock:
+            done_path = os.path.join(self._dir('done'), lease.shard)
+            try:
+                os.rename(lease.lease_path, done_path)
+            except FileNotFoundError:
+                # 租约被回收后分片可能回到了todo，结果已写入，直接标记完成避免重复处理
+                try:
+                    os.rename(os.path.join(self._dir('todo'), lease.shard), done_path)
+                except FileNotFoundError:
+                    pass
+            lease.lost = True
+        logger.info(f"完成分片 {lease.shard}")
+    
+    def reclaim_expired(self) -> int:
+        """将已过期的租约放回todo目录，返回回收数量"""
+        now_ms = int(time.time() * 1000)
+        reclaimed = 0
+        for name in os.listdir(self._dir('leases')):
+            # 分片名不含'@'，从左侧切出分片名，从右侧切出过期时间，节点ID取中间部分
+            shard, _, rest = name.partition('@')
+            worker_id, _, expiry = rest.rpartition('@')
+            if not shard.endswith('.json') or not expiry.isdigit() or int(expiry) > now_ms:
+                continue
+            try:
+                os.rename(os.path.join(self._dir('leases'), name), os.path.join(self._dir('todo'), shard))
+                reclaimed += 1
+                logger.warning(f"回收过期分片 {shard}（节点 {worker_id}）")
+            except FileNotFoundError:
+                # 节点刚好续约或已被其他节点回收
+                continue
+        return reclaimed
+    
+    def status(self) -> Dict[str, int]:
+        """各状态的分片数量"""
+        return {
+            name: len([n for n in os.listdir(self._dir(name)) if not n.startswith('.')])
+            for name in ('todo', 'leases', 'done')
+        }
+    
+    def is_finished(self) -> bool:
+        """所有分片是否均已完成"""
+        status = self.status()
+        return status['todo'] == 0 and status['leases'] == 0
+    
+    def merge(self, output_path: str) -> int:
+        """
+        按分片顺序合并所有结果，同一路径只保留一条
+        
+        Returns:
+            合并后的记录数
+        """
+        seen = set()
+        count = 0
+        with open(output_path, 'w', encoding='utf-8') as out:
+            for name in sorted(os.listdir(self._dir('results'))):
+                if not name.endswith('.jsonl'):
+                    continue
+                with open(os.path.join(self._dir('results'), name), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        path = json.loads(line)['path']
+                        if path in seen:
+                            continue
+                        seen.add(path)
+                        out.write(line if line.endswith('\n') else line + '\n')
+                        count += 1
+        logger.info(f"合并 {count} 条结果到 {output_path}")
+        return count
+    
+    def _lease_name(self, shard: str, worker_id: str) -> str:
+        expiry_ms = int((time.time() + self.lease_ttl) * 1000)
+        return f'{shard}@{worker_id}@{expiry_ms}'
+    
+    @staticmethod
+    def _write_atomic(path: str, content: str, suffix: str = ''):
+        """写临时文件后rename，读取方不会看到写了一半的文件"""
+        tmp_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}{suffix}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def sanitize_worker_id(worker_id: str) -> str:
+    """将节点ID中的'@'和路径分隔符替换为'_'，节点ID会写入租约和结果临时文件名"""
+    for char in ('@', '/', os.sep):
+        worker_id = worker_id.replace(char, '_')
+    if not worker_id.strip('.'):
+        raise Exception(f"无效的节点ID: {worker_id!r}")
+    return worker_id
+
+
+def default_worker_id() -> str:
+    """默认节点ID：主机名-进程号"""
+    return sanitize_worker_id(f'{socket.gethostname()}-{os.getpid()}')
+
+
+def run_worker(queue: ShardQueue, parser, worker_id: Optional[str] = None, jobs: int = 1, poll_interval: float = 5, tuner=None) -> int:
+    """
+    持续领取并处理分片，直到队列中所有分片都已完成
+    
+    Args:
+        queue: 分片队列
+        parser: 渠道解析器（ChannelParser）
+        worker_id: 节点ID
+        jobs: 每个分片内的并发解析数
+        poll_interval: 暂无可领取分片时的等待间隔（秒）
+        tuner: 自适应并发调节器（ConcurrencyTuner），在各分片间共用，指定时忽略jobs
+    
+    Returns:
+        本节点处理的分片数
+    """
+    worker_id = sanitize_worker_id(worker_id) if worker_id else default_worker_id()
+    processed = 0
+    
+    while True:
+        lease = queue.claim(worker_id)
+        if lease is None:
+            if queue.is_finished():
+                break
+            # 其他节点仍持有租约，等待其完成或过期
+            time.sleep(poll_interval)
+            continue
+        
+        stop = threading.Event()
+        
+        def heartbeat():
+            while not stop.wait(queue.lease_ttl / 3):
+                if not queue.renew(lease):
+                    break
+        
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            results = parser.batch_parse(lease.paths, jobs=jobs, tuner=tuner)
+            records = []
+            for apk_path, result in results.items():
+                try:
+                    records.append(make_record(apk_path, result))
+                except OSError as e:
+                    records.append({'path': os.path.abspath(apk_path), 'success': False, 'error': str(e)})
+            queue.complete(lease, records)
+            processed += 1
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+    
+    logger.info(f"节点 {worker_id} 处理完成，共 {processed} 个分片")
+    return processed
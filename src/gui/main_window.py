@@ -106,6 +106,10 @@ class MainWindow:
         """选择APK文件并自动解析"""
         from tkinter import filedialog
         
+        # 对话框打开期间在后台预热Java，隐藏JVM冷启动耗时
+        if self.parser:
+            self.parser.warm_up()
+        
         initial_dir = self.config.get('last_apk_dir', os.path.expanduser("~"))
         file_path = filedialog.askopenfilename(
             title="选择APK文件",
@@ -113,12 +117,18 @@ class MainWindow:
             filetypes=[("APK文件", "*.apk"), ("所有文件", "*.*")]
         )
         
-        if file_path:
-            logger.info(f"选择APK文件: {file_path}")
-            # 保存目录到配置
-            self.config['last_apk_dir'] = os.path.dirname(file_path)
-            # 自动开始解析
-            self._do_parse_apk(file_path)
+        # 对话框已返回，预热的作用到此为止；尚未结束的预热进程不能与随后的解析争抢调度器名额
+        if self.parser:
+            self.parser.cancel_warm_up()
+        
+        if not file_path:
+            return
+        
+        logger.info(f"选择APK文件: {file_path}")
+        # 保存目录到配置
+        self.config['last_apk_dir'] = os.path.dirname(file_path)
+        # 自动开始解析
+        self._do_parse_apk(file_path)
     
     def _do_parse_apk(self, apk_path):
         """执行渠道解析"""
@@ -210,5 +220,7 @@ class MainWindow:
     def _on_closing(self):
         """窗口关闭事件"""
         self._save_config()
+        if self.parser:
+            self.parser.cancel_warm_up()
         self.root.destroy()
 
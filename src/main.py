@@ -6,6 +6,8 @@ VasDolly渠道解析工具 - 主程序入口
 """
 import sys
 import os
+import time
+import threading
 import traceback
 import tkinter as tk
 from tkinter import messagebox
@@ -21,13 +23,12 @@ else:
 sys.path.insert(0, base_path)
 sys.path.insert(0, os.path.join(base_path, 'src'))
 
-try:
-    from src.gui.main_window import MainWindow
-    from src.utils.logger import logger
-except ImportError:
-    # 备用导入方式
-    from gui.main_window import MainWindow
-    from utils.logger import logger
+# 统一按src下的模块路径导入，与各模块内部的导入方式一致；
+# 若同时以src.xxx导入，同一模块会被加载两次（日志处理器、调度器等全局对象各有一份）
+from gui.main_window import MainWindow
+from utils.logger import logger
+from cli import run_cli
+from utils.profiler import Profiler
 
 
 def write_error_log(error_msg: str):
@@ -45,8 +46,62 @@ def write_error_log(error_msg: str):
         return None
 
 
+def run_startup_probe(root, app):
+    """
+    启动耗时探针（供benchmarks/bench_startup.py测量启动性能）
+    
+    设置环境变量VASDOLLY_STARTUP_PROBE=1后启用：窗口显示后输出"PROBE window"；
+    若同时设置VASDOLLY_PROBE_APK，则在初始化完成后解析该APK并输出"PROBE result"，随后退出。
+    """
+    apk_path = os.environ.get('VASDOLLY_PROBE_APK')
+    
+    def probe_parse():
+        deadline = time.monotonic() + 60
+        while app.parser is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        try:
+            app.parser.get_channel(apk_path)
+            print("PROBE result", flush=True)
+        except Exception as e:
+            print(f"PROBE error {str(e)}", flush=True)
+        root.after(0, root.destroy)
+    
+    def on_window():
+        print("PROBE window", flush=True)
+        if apk_path:
+            threading.Thread(target=probe_parse, daemon=True).start()
+        else:
+            root.after(0, root.destroy)
+    
+    root.after_idle(on_window)
+
+
 def main():
-    """主函数"""
+    """
+    主函数
+    
+    任意位置加 --profile 时对整个会话做性能剖析（GUI和命令行模式均可），
+    退出时在日志目录写入 .pstats 和折叠栈文件。
+    """
+    argv = sys.argv[1:]
+    profiler = None
+    if '--profile' in argv:
+        argv = [arg for arg in argv if arg != '--profile']
+        profiler = Profiler()
+        profiler.start()
+    
+    try:
+        # 带参数启动时进入命令行模式
+        if argv:
+            sys.exit(run_cli(argv))
+        run_gui()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+def run_gui():
+    """启动图形界面"""
     try:
         # 创建主窗口
         root = tk.Tk()
@@ -63,6 +118,9 @@ def main():
         
         logger.info("VasDolly工具已启动")
         
+        if os.environ.get('VASDOLLY_STARTUP_PROBE'):
+            run_startup_probe(root, app)
+        
         # 运行主循环
         root.mainloop()
         
@@ -1,8 +1,11 @@
 """文件操作辅助模块"""
 import os
 import json
+import hashlib
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
+from core.apk_reader import ApkReader, ApkFormatError, EOCD_SIZE
+from utils import tracer
 
 
 class FileHelper:
@@ -34,7 +37,11 @@ class FileHelper:
     @staticmethod
     def get_file_size(file_path: str) -> str:
         """获取文件大小（人类可读格式）"""
-        size = os.path.getsize(file_path)
+        return FileHelper.format_size(os.path.getsize(file_path))
+    
+    @staticmethod
+    def format_size(size: float) -> str:
+        """字节数转换为人类可读格式"""
         for unit in ['B', 'KB', 'MB', 'GB']:
             if size < 1024.0:
                 return f"{size:.2f} {unit}"
@@ -46,6 +53,57 @@ class FileHelper:
         """检查是否是APK文件"""
         return file_path.lower().endswith('.apk') and os.path.isfile(file_path)
     
+    @staticmethod
+    def find_apk_files(dir_path: str) -> List[str]:
+        """递归查找目录下的所有APK文件（按路径排序）"""
+        apk_files = []
+        with tracer.span('walk', 'io', dir=dir_path) as walk_span:
+            for root, _, files in os.walk(dir_path):
+                for name in files:
+                    if name.lower().endswith('.apk'):
+                        apk_files.append(os.path.join(root, name))
+            apk_files.sort()
+            walk_span.set(files=len(apk_files))
+        return apk_files
+    
+    @staticmethod
+    def quick_fingerprint(file_path: str, chunk_size: int = 64 * 1024) -> str:
+        """
+        计算文件快速指纹：文件大小 + 头部和尾部各64KB + APK签名块和EOCD（含注释）的SHA-1
+        
+        V2渠道写在签名块中，位于中央目录之前，中央目录超过64KB时不在尾部窗口内，
+        因此单独定位并计入签名块；V1渠道在EOCD注释中。
+        文件不是有效的APK、无法定位这些结构时只计入大小和头尾窗口，
+        避免损坏或恶意构造的大文件被整个读取。
+        """
+        size = os.path.getsize(file_path)
+        digest = hashlib.sha1(str(size).encode('ascii'))
+        with open(file_path, 'rb') as f:
+            try:
+                with ApkReader(f) as reader:
+                    eocd_offset, comment_size = reader.find_eocd()
+                    block = reader.find_signing_block()
+                    regions = [(eocd_offset, EOCD_SIZE + comment_size)]
+                    if block is not None:
+                        regions.insert(0, block)
+            except ApkFormatError:
+                regions = []
+            
+            f.seek(0)
+            digest.update(f.read(chunk_size))
+            if size > chunk_size:
+                f.seek(max(chunk_size, size - chunk_size))
+                digest.update(f.read(chunk_size))
+            for offset, length in regions:
+                f.seek(offset)
+                while length > 0:
+                    data = f.read(min(length, 1024 * 1024))
+                    if not data:
+                        break
+                    digest.update(data)
+                    length -= len(data)
+        return digest.hexdigest()
+    
     @staticmethod
     def get_resource_path(relative_path: str) -> str:
         """获取资源文件路径（支持打包后的路径）"""
@@ -10,9 +10,12 @@ class Logger:
     def __init__(self, name='VasDollyTool'):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
+        if self.logger.handlers:
+            # 模块被以不同路径重复导入时不再重复添加处理器，否则每条日志输出多次
+            return
         
-        # 控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
+        # 控制台处理器：输出到stderr，命令行模式的stdout只包含结果，可直接用管道处理
+        console_handler = logging.StreamHandler(sys.stderr)
         console_handler.setLevel(logging.INFO)
         
         # 文件处理器
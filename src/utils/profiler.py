@@ -0,0 +1,147 @@
+"""
+性能剖析模块
+
+启动时加 --profile（GUI和命令行模式均可）后，整个会话同时运行两种剖析：
+    - cProfile确定性剖析，覆盖所有线程，退出时写入 .pstats 文件，
+      可用 python -m pstats 或 snakeviz 查看
+    - 定时采样各线程调用栈，写入折叠栈文本（每行"栈帧;栈帧;... 次数"），
+      可直接交给 flamegraph.pl、speedscope 或 inferno 生成火焰图
+
+两个文件写入日志目录（logs/），文件名带时间戳和进程号。
+只依赖标准库，打包后的程序同样可用。
+"""
+import os
+import sys
+import time
+import cProfile
+import pstats
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+from utils.logger import logger
+
+
+# Python 3.12起cProfile基于sys.monitoring，一个实例即可覆盖所有线程
+_PROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """会话级剖析器：cProfile + 调用栈采样"""
+    
+    def __init__(self, output_dir: str = 'logs', interval: float = 0.005):
+        """
+        Args:
+            output_dir: 输出目录
+            interval: 调用栈采样间隔（秒）
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._started = 0.0
+    
+    def start(self):
+        """开始剖析，之后新建的线程也会被剖析"""
+        self._started = time.monotonic()
+        if not _PROFILE_ALL_THREADS:
+            threading.setprofile(self._profile_thread)
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        profile.enable()
+        
+        self._sampler = threading.Thread(target=self._sample_loop, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+        logger.info(f"已启用性能剖析，采样间隔 {self.interval * 1000:.0f}ms")
+    
+    def _profile_thread(self, frame, event, arg):
+        """threading.setprofile钩子：在每个新线程中启用独立的cProfile实例"""
+        if threading.current_thread() is self._sampler:
+            sys.setprofile(None)
+            return
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        # enable()会替换本线程的profile函数，此钩子之后不再被调用
+        profile.enable()
+    
+    def _sample_loop(self):
+        """定时采样除自身外所有线程的调用栈"""
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f'thread-{thread_id}'))
+                stack.reverse()
+                self._stacks[';'.join(stack)] += 1
+            self._samples += 1
+    
+    def stop(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        停止剖析并写入文件
+        
+        Returns:
+            (pstats文件路径, 折叠栈文件路径)，没有数据时对应项为None
+        """
+        if not _PROFILE_ALL_THREADS:
+            threading.setprofile(None)
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+        
+        with self._lock:
+            profiles = list(self._profiles)
+        # 先停止主线程的实例；其余线程的实例汇总时各自生成快照
+        profiles[0].disable()
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(
+            self.output_dir,
+            f'profile_{datetime.now().strftime("%Y%m%d_%H%M%S")}_{os.getpid()}'
+        )
+        
+        stats_path = None
+        stats = self._merge_stats(profiles)
+        if stats is not None:
+            stats_path = f'{prefix}.pstats'
+            stats.dump_stats(stats_path)
+        
+        collapsed_path = None
+        if self._stacks:
+            collapsed_path = f'{prefix}.collapsed'
+            with open(collapsed_path, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self._stacks.items()):
+                    f.write(f'{stack} {count}\n')
+        
+        elapsed = time.monotonic() - self._started
+        logger.info(
+            f"性能剖析已保存（{elapsed:.1f}秒，{len(profiles)} 个线程，{self._samples} 次采样）: "
+            f"{stats_path}，{collapsed_path}"
+        )
+        return stats_path, collapsed_path
+    
+    @staticmethod
+    def _merge_stats(profiles: List[cProfile.Profile]) -> Optional[pstats.Stats]:
+        """合并各线程的剖析结果，没有任何记录时返回None"""
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 线程中没有任何函数调用记录
+                continue
+        return stats
@@ -0,0 +1,171 @@
+"""
+时间线追踪模块
+
+记录批量扫描各阶段的耗时区间，输出Chrome trace-event JSON，
+可直接拖入 https://ui.perfetto.dev 或 chrome://tracing 查看。
+
+默认关闭，关闭时span()直接返回共享的空对象，几乎没有开销。
+启用方式：命令行 --trace 文件路径，或设置环境变量 VASDOLLY_TRACE=文件路径；
+路径中的 {pid} 会替换为进程号，多个工作进程可分别输出。
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from typing import Any, Dict, List, Optional
+from utils.logger import logger
+
+
+# 已记录的事件，为None表示未启用
+_events: Optional[List[Dict[str, Any]]] = None
+_output_path: Optional[str] = None
+_lock = threading.Lock()
+_named_threads = set()
+# perf_counter_ns转换为墙上时间的偏移，使不同进程的时间线可以对齐
+_epoch_offset_ns = 0
+_atexit_registered = False
+
+
+class _NullSpan:
+    """追踪关闭时使用的空区间"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """一个耗时区间，退出时记录为Chrome trace的完整事件（ph=X）"""
+    
+    __slots__ = ('name', 'cat', 'args', 'start_ns')
+    
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start_ns = 0
+    
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        _record(self.name, self.cat, self.start_ns, end_ns - self.start_ns, self.args)
+        return False
+    
+    def set(self, **args):
+        """补充区间参数（如返回码、渠道名）"""
+        self.args.update(args)
+
+
+def span(name: str, cat: str = 'scan', **args):
+    """
+    记录一个耗时区间
+    
+    用法：
+        with tracer.span('spawn', 'java', file=name) as s:
+            ...
+            s.set(code=0)
+    
+    Args:
+        name: 区间名称
+        cat: 分类，Perfetto中可按分类筛选
+        args: 附加参数，显示在区间详情中
+    """
+    if _events is None:
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def is_enabled() -> bool:
+    """追踪是否已启用"""
+    return _events is not None
+
+
+def _record(name: str, cat: str, start_ns: int, duration_ns: int, args: Dict[str, Any]):
+    events = _events
+    if events is None:
+        return
+    thread = threading.current_thread()
+    tid = thread.ident
+    if tid not in _named_threads:
+        with _lock:
+            if tid not in _named_threads:
+                _named_threads.add(tid)
+                events.append({
+                    'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                    'args': {'name': thread.name},
+                })
+    # list.append在CPython中是原子操作，工作线程无需加锁
+    events.append({
+        'name': name,
+        'cat': cat,
+        'ph': 'X',
+        'ts': (start_ns + _epoch_offset_ns) / 1000,
+        'dur': duration_ns / 1000,
+        'pid': os.getpid(),
+        'tid': tid,
+        'args': args,
+    })
+
+
+def enable(output_path: str):
+    """
+    启用追踪，进程退出时自动写入文件
+    
+    Args:
+        output_path: 输出的JSON文件路径，{pid} 会替换为进程号
+    """
+    global _events, _output_path, _epoch_offset_ns, _atexit_registered
+    with _lock:
+        _output_path = output_path.replace('{pid}', str(os.getpid()))
+        _epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+        _named_threads.clear()
+        _events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+            'args': {'name': f'VasDollyTool {os.getpid()}'},
+        }]
+        if not _atexit_registered:
+            atexit.register(save)
+            _atexit_registered = True
+    logger.info(f"已启用时间线追踪: {_output_path}")
+
+
+def save() -> int:
+    """
+    将已记录的事件写入文件并停止追踪
+    
+    Returns:
+        写入的事件数，未启用时返回0
+    """
+    global _events
+    with _lock:
+        events, _events = _events, None
+    if events is None:
+        return 0
+    
+    directory = os.path.dirname(_output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(_output_path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+    logger.info(f"时间线已写入: {_output_path}（{len(events)} 个事件）")
+    return len(events)
+
+
+if os.environ.get('VASDOLLY_TRACE'):
+    enable(os.environ['VASDOLLY_TRACE'])